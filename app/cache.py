@@ -0,0 +1,348 @@
+import json
+import time
+import atexit
+import asyncio
+import sqlite3
+import hashlib
+import weakref
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+from app.config import get_settings
+from app.telemetry import get_logger, CACHE_LOOKUPS, CACHE_WARM_HITS
+
+settings = get_settings()
+log = get_logger("cache")
+
+# اتصال SQLite واحد لكل ملف داخل العملية (العمال الآخرون يفتحون اتصالاتهم)
+_connections = {}
+_connections_lock = threading.Lock()
+
+def get_connection(db_path: str):
+    with _connections_lock:
+        if db_path not in _connections:
+            conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+            # المداخل التي كتبها التسخين المسبق (app.prewarm) ونسختها، لقياس نسبة خدمتها وقت الذروة
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS warmed ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL,"
+                " warmed_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.commit()
+            _connections[db_path] = (conn, threading.Lock())
+        return _connections[db_path]
+
+# آخر استخدام وإصابات التسخين تُجمع في الذاكرة وتُكتب دفعة واحدة من خيط خلفي كل CACHE_FLUSH_INTERVAL:
+# القراءة من الكاش لا تكتب في SQLite على حلقة الأحداث
+_caches = weakref.WeakSet()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+def flush_pending():
+    for cache in list(_caches):
+        cache.flush()
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.CACHE_FLUSH_INTERVAL)
+        flush_pending()
+
+def _start_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name="cache-flush", daemon=True)
+            _flusher.start()
+            atexit.register(flush_pending)
+
+def normalize_text(value) -> str:
+    """
+    توحيد النص للمفتاح: حذف الفراغات الزائدة وتجاهل حالة الأحرف.
+    """
+    if value is None:
+        return ""
+    return " ".join(str(value).split()).casefold()
+
+def make_key(*parts) -> str:
+    payload = json.dumps([normalize_text(p) for p in parts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+class TieredCache:
+    """
+    كاش على طبقتين: ذاكرة (LRU) داخل العملية + SQLite مشترك بين كل عمال uvicorn.
+    القيم يجب أن تكون قابلة للتحويل إلى JSON.
+    من داخل حلقة الأحداث: aget / aget_entry / aset / adelete (طبقة SQLite في خيط منفصل،
+    فقفل الكتابة بين العمال لا يوقف الحلقة). الدوال المتزامنة للكود المتزامن فقط.
+    """
+
+    def __init__(self, namespace: str, ttl: float, memory_size: int = 256, disk_size: int = 5000,
+                 stale_ttl: float = 0, db_path: Optional[str] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        # المدة التي نحتفظ فيها بالقيمة بعد انتهاء صلاحيتها لخدمتها كنسخة قديمة
+        self.stale_ttl = stale_ttl
+        self.db_path = db_path or settings.CACHE_DB_PATH
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # {المفتاح: (stored_at, هل كتبها التسخين المسبق)} حتى لا نسأل SQLite مع كل hit
+        self._warm_seen = OrderedDict()
+        # بانتظار الكتابة: {المفتاح: آخر استخدام} و {(المفتاح، stored_at): عدد إصابات التسخين}
+        self._touched = {}
+        self._warm_hits = Counter()
+        self.hits = 0
+        self.misses = 0
+        _caches.add(self)
+
+    def _disk(self):
+        return get_connection(self.db_path)
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """
+        يعيد القيمة حتى لو كانت منتهية الصلاحية (ضمن stale_ttl)، والمستدعي يقرر.
+        """
+        now = time.time()
+        entry = self._memory_entry(key, now)
+        return entry if entry is not None else self._disk_entry(key, now)
+
+    async def aget_entry(self, key: str) -> Optional[CacheEntry]:
+        now = time.time()
+        entry = self._memory_entry(key, now)
+        return entry if entry is not None else await asyncio.to_thread(self._disk_entry, key, now)
+
+    def _memory_entry(self, key: str, now: float) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now < entry.expires_at + self.stale_ttl:
+                    self._memory.move_to_end(key)
+                    return entry
+                del self._memory[key]
+        return None
+
+    def _disk_entry(self, key: str, now: float) -> Optional[CacheEntry]:
+        conn, lock = self._disk()
+        with lock:
+            row = conn.execute(
+                "SELECT value, stored_at, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        # المنتهي تماماً يُحذف مع الكتابة التالية في set
+        if row is None or now >= row[2] + self.stale_ttl:
+            return None
+
+        entry = CacheEntry(json.loads(row[0]), row[1], row[2])
+        self._remember(key, entry)
+        with self._lock:
+            self._touched[key] = now
+        _start_flusher()
+        return entry
+
+    def get(self, key: str, allow_stale: bool = False):
+        entry = self.get_entry(key)
+        if entry is not None and not (entry.fresh or allow_stale):
+            entry = None
+        self.record(entry, key)
+        return entry.value if entry is not None else None
+
+    async def aget(self, key: str, allow_stale: bool = False):
+        entry = await self.aget_entry(key)
+        if entry is not None and not (entry.fresh or allow_stale):
+            entry = None
+        await self.arecord(entry, key)
+        return entry.value if entry is not None else None
+
+    def record(self, entry: Optional[CacheEntry], key: str = None):
+        """
+        تسجيل نتيجة بحث (hit / stale / miss) في العدادات ومقاييس Prometheus.
+        من يستخدم get_entry مباشرة يستدعيها بنفسه. مع key تُحسب أيضاً الإصابات في مداخل التسخين المسبق.
+        """
+        if entry is None:
+            self.misses += 1
+            result = "miss"
+        else:
+            self.hits += 1
+            result = "hit" if entry.fresh else "stale"
+        CACHE_LOOKUPS.labels(cache=self.namespace, result=result).inc()
+        if key is not None and result == "hit" and self._is_warmed(key, entry):
+            CACHE_WARM_HITS.labels(cache=self.namespace).inc()
+
+    async def arecord(self, entry: Optional[CacheEntry], key: str = None):
+        # أول إصابة لكل نسخة تحتاج SELECT من جدول warmed: خارج الحلقة، ثم record من الذاكرة
+        if key is not None and entry is not None and entry.fresh and self._warm_known(key, entry) is None:
+            await asyncio.to_thread(self._lookup_warmed, key, entry)
+        self.record(entry, key)
+
+    def _warm_known(self, key: str, entry: CacheEntry) -> Optional[bool]:
+        with self._lock:
+            seen = self._warm_seen.get(key)
+            if seen is not None and seen[0] == entry.stored_at:
+                self._warm_seen.move_to_end(key)
+                return seen[1]
+        return None
+
+    def _lookup_warmed(self, key: str, entry: CacheEntry) -> bool:
+        conn, lock = self._disk()
+        with lock:
+            # نفس النسخة فقط: لو أعاد طلب عادي توليدها بعد التسخين فهي ليست إصابة تسخين
+            warmed = conn.execute(
+                "SELECT 1 FROM warmed WHERE namespace = ? AND key = ? AND stored_at = ?",
+                (self.namespace, key, entry.stored_at),
+            ).fetchone() is not None
+        with self._lock:
+            self._warm_seen[key] = (entry.stored_at, warmed)
+            while len(self._warm_seen) > self.memory_size:
+                self._warm_seen.popitem(last=False)
+        return warmed
+
+    def _is_warmed(self, key: str, entry: CacheEntry) -> bool:
+        warmed = self._warm_known(key, entry)
+        if warmed is None:
+            warmed = self._lookup_warmed(key, entry)
+        if warmed:
+            with self._lock:
+                self._warm_hits[key, entry.stored_at] += 1
+            _start_flusher()
+        return warmed
+
+    def _write_pending(self, conn):
+        # يُستدعى داخل قفل الاتصال؛ المستدعي يعمل commit
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            warm_hits, self._warm_hits = self._warm_hits, Counter()
+        conn.executemany(
+            "UPDATE cache SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND key = ?",
+            [(accessed_at, self.namespace, key) for key, accessed_at in touched.items()],
+        )
+        conn.executemany(
+            "UPDATE warmed SET hits = hits + ? WHERE namespace = ? AND key = ? AND stored_at = ?",
+            [(hits, self.namespace, key, stored_at) for (key, stored_at), hits in warm_hits.items()],
+        )
+
+    def flush(self):
+        """
+        كتابة آخر استخدام وإصابات التسخين المتراكمة دفعة واحدة (من خيط التفريغ الخلفي).
+        """
+        with self._lock:
+            if not self._touched and not self._warm_hits:
+                return
+        conn, lock = self._disk()
+        try:
+            with lock:
+                self._write_pending(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            log.warning("⚠️ Cache Flush Error", cache=self.namespace, error=str(e))
+
+    def mark_warmed(self, key: str):
+        """
+        تسجيل النسخة الحالية من المدخل كنتيجة تسخين مسبق (يستدعيها app.prewarm بعد الكتابة).
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            return
+        now = time.time()
+        conn, lock = self._disk()
+        with lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO warmed (namespace, key, stored_at, warmed_at, hits) VALUES (?, ?, ?, ?, 0)",
+                (self.namespace, key, entry.stored_at, now),
+            )
+            conn.execute(
+                "DELETE FROM warmed WHERE namespace = ? AND warmed_at < ?",
+                (self.namespace, now - settings.PREWARM_RETENTION),
+            )
+            conn.commit()
+
+    async def amark_warmed(self, key: str):
+        await asyncio.to_thread(self.mark_warmed, key)
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        self._write(key, self._new_entry(key, value, ttl))
+
+    async def aset(self, key: str, value, ttl: Optional[float] = None):
+        # الذاكرة فوراً (نفس العملية ترى القيمة)، وSQLite خارج الحلقة
+        await asyncio.to_thread(self._write, key, self._new_entry(key, value, ttl))
+
+    def _new_entry(self, key: str, value, ttl: Optional[float]) -> CacheEntry:
+        now = time.time()
+        entry = CacheEntry(value, now, now + (self.ttl if ttl is None else ttl))
+        self._remember(key, entry)
+        return entry
+
+    def _write(self, key: str, entry: CacheEntry):
+        now = entry.stored_at
+        conn, lock = self._disk()
+        with lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(entry.value, ensure_ascii=False), entry.stored_at, entry.expires_at, now),
+            )
+            # الإخلاء (LRU) يحتاج آخر استخدام الحقيقي: نكتب المتراكم في نفس المعاملة
+            self._write_pending(conn)
+            # تنظيف المنتهي ثم إخلاء الأقدم استخداماً (LRU) عند تجاوز الحجم
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at + ? < ?",
+                (self.namespace, self.stale_ttl, now),
+            )
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.disk_size),
+            )
+            conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        self._delete_disk(key)
+
+    async def adelete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        await asyncio.to_thread(self._delete_disk, key)
+
+    def _delete_disk(self, key: str):
+        conn, lock = self._disk()
+        with lock:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+            conn.commit()
+
+    def _remember(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
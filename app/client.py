@@ -0,0 +1,128 @@
+import json
+import time
+import threading
+import httpx
+from app.config import get_settings
+from app.schemas import DominanceRequest
+
+settings = get_settings()
+
+class RemoteEngineError(Exception):
+    """
+    خطأ من خادم المحرك (رسالة الـ detail كما أعادها الـ API).
+    """
+
+class RemoteEngine:
+    """
+    نفس واجهة DominanceEngine التي تستخدمها لوحات Streamlit (process / stream / process_batch)
+    لكن عبر الـ API: لا SDKs ثقيلة في الواجهة، وكل استدعاءات النموذج تمر بكاش وبوابة طبقة المحرك.
+    عميل HTTP واحد (keep-alive) مشترك بين كل الجلسات.
+    """
+
+    def __init__(self, base_url: str, timeout: float = None, transport: httpx.BaseTransport = None):
+        self.base_url = base_url.rstrip("/")
+        self.prefix = settings.API_PREFIX
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout or settings.DASHBOARD_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            # transport بديل (مثل httpx.MockTransport) للقياس بدون خادم
+            transport=transport,
+        )
+
+    def _check(self, response: httpx.Response):
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise RemoteEngineError(f"{response.status_code}: {detail}")
+        return response
+
+    def process(self, request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False, refresh: bool = False) -> dict:
+        # الاستنساخ والرادار يتجاوزان مهلة طلب HTTP: يمران عبر طابور المهام
+        if video_url or radar_mode:
+            return self._run_job(request, language, video_url, radar_mode, refresh)
+        response = self._client.post(
+            f"{self.prefix}/generate",
+            params={"language": language, "refresh": refresh},
+            content=request.model_dump_json(),
+            headers={"Content-Type": "application/json"},
+        )
+        return self._check(response).json()
+
+    def stream(self, request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False, refresh: bool = False):
+        if video_url or radar_mode:
+            yield from pack_events(self._run_job(request, language, video_url, radar_mode, refresh))
+            return
+        with self._client.stream(
+            "POST", f"{self.prefix}/generate/stream",
+            params={"language": language, "refresh": refresh, "format": "ndjson"},
+            content=request.model_dump_json(),
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            if response.status_code >= 400:
+                response.read()
+                self._check(response)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["event"] == "error":
+                    raise RemoteEngineError(event["data"].get("detail", "Stream failed"))
+                yield event
+
+    def process_batch(self, requests: list, language: str = "English", refresh: bool = False, pack_size: int = 1) -> list:
+        payload = {
+            "items": [r.model_dump(mode="json") for r in requests],
+            "language": language, "refresh": refresh, "pack_size": pack_size,
+        }
+        response = self._client.post(f"{self.prefix}/generate/batch", json=payload)
+        return self._check(response).json()["results"]
+
+    def _run_job(self, request, language, video_url, radar_mode, refresh) -> dict:
+        response = self._client.post(f"{self.prefix}/jobs", json={
+            "request": request.model_dump(mode="json"),
+            "language": language, "video_url": video_url, "radar_mode": radar_mode, "refresh": refresh,
+        })
+        job_id = self._check(response).json()["job_id"]
+        deadline = time.monotonic() + settings.DASHBOARD_JOB_TIMEOUT
+        while time.monotonic() < deadline:
+            status = self._check(self._client.get(f"{self.prefix}/jobs/{job_id}")).json()
+            if status["status"] == "done":
+                return self._check(self._client.get(f"{self.prefix}/jobs/{job_id}/result")).json()
+            if status["status"] == "failed":
+                raise RemoteEngineError(status.get("error") or "Job failed")
+            time.sleep(settings.DASHBOARD_JOB_POLL_INTERVAL)
+        raise RemoteEngineError(f"Job {job_id} did not finish in {settings.DASHBOARD_JOB_TIMEOUT}s")
+
+    def close(self):
+        self._client.close()
+
+def pack_events(pack: dict):
+    """
+    نفس تفكيك app.engine.pack_events بدون استيراد المحرك.
+    """
+    yield {"event": "score", "data": pack["score_data"]}
+    for h in pack["hooks"]:
+        yield {"event": "hook", "data": h}
+    for s in pack["script"]:
+        yield {"event": "scene", "data": s}
+    yield {"event": "pack", "data": pack}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """
+    المحرك الذي تستخدمه اللوحة: بعيد إذا كان DASHBOARD_ENGINE_URL مضبوطاً، وإلا داخل العملية.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            if settings.DASHBOARD_ENGINE_URL:
+                _engine = RemoteEngine(settings.DASHBOARD_ENGINE_URL)
+            else:
+                from app.engine import DominanceEngine
+                _engine = DominanceEngine
+    return _engine
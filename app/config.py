@@ -9,6 +9,130 @@ class Settings(BaseSettings):
     # مفتاح جوجل (يتم قراءته من Render Environment)
     GOOGLE_API_KEY: str = "PLACEHOLDER_KEY" 
 
+    # مستوى السجلات (JSON سطر لكل حدث، debug يُظهر زمن كل مرحلة)
+    LOG_LEVEL: str = "INFO"
+
+    # مهلة كل مرحلة بالثواني (المراحل الاختيارية تُتجاوز عند انتهاء المهلة)
+    HASHTAG_TIMEOUT: float = 2.0
+    SCRAPE_TIMEOUT: float = 90.0
+    DNA_TIMEOUT: float = 20.0
+    GENERATION_TIMEOUT: float = 60.0
+
+    # ميزانية الطلب كاملاً (قابلة للتغيير لكل طلب عبر ?deadline=) وكل المراحل تُقص إليها
+    REQUEST_DEADLINE: float = 60.0
+    MAX_REQUEST_DEADLINE: float = 300.0
+    JOB_DEADLINE: float = 900.0
+    # الوقت المحجوز للتوليد: المراحل الاختيارية (هاشتاجات، DNA) لا تستهلكه
+    DEADLINE_GENERATION_RESERVE: float = 20.0
+    # أقل وقت متبقٍ يستحق استدعاءات إصلاح الأقسام الناقصة
+    DEADLINE_MIN_REPAIR: float = 5.0
+    DEGRADED_CACHE_TTL: float = 600
+
+    # النصوص المفرغة الأطول من هذه الميزانية تُقص قبل تحليل الـ DNA
+    DNA_TRANSCRIPT_TOKEN_BUDGET: int = 1500
+
+    # لوحة Streamlit: نتائج نفس المدخلات تُعاد من الذاكرة خلال هذه المدة
+    DASHBOARD_CACHE_TTL: float = 3600
+    DASHBOARD_CACHE_ENTRIES: int = 200
+    # فارغ = المحرك داخل عملية Streamlit، أو رابط الـ API (مثل http://engine:8000) لوضع المحرك البعيد
+    DASHBOARD_ENGINE_URL: str = ""
+    DASHBOARD_HTTP_TIMEOUT: float = 120.0
+    DASHBOARD_JOB_POLL_INTERVAL: float = 1.0
+    DASHBOARD_JOB_TIMEOUT: float = 600.0
+
+    # الكاش المشترك (SQLite) بين كل العمال
+    CACHE_DB_PATH: str = "dominator_cache.sqlite3"
+    CACHE_FLUSH_INTERVAL: float = 5.0
+    GENERATION_CACHE_TTL: float = 6 * 3600
+    GENERATION_CACHE_MEMORY_SIZE: int = 256
+    GENERATION_CACHE_DISK_SIZE: int = 5000
+
+    # كاش الـ DNA الفيروسي (وضع الاستنساخ) حسب رقم الفيديو
+    DNA_CACHE_TTL: float = 7 * 86400
+    DNA_NEGATIVE_TTL: float = 600
+    SHORT_LINK_TIMEOUT: float = 5.0
+
+    # الهاشتاجات الرائجة تتغير كل عدة ساعات وليس مع كل طلب
+    HASHTAG_CACHE_TTL: float = 3 * 3600
+    HASHTAG_STALE_TTL: float = 24 * 3600
+    HASHTAG_NEGATIVE_TTL: float = 300
+    HASHTAG_HTTP_TIMEOUT: float = 5.0
+
+    # لغة جديدة لطلب موجود بلغة أخرى = استدعاء ترجمة صغير بدل توليد كامل
+    TRANSLATE_VARIANTS: bool = True
+    MAX_LANGUAGES_PER_REQUEST: int = 6
+
+    # مواضيع متقاربة: إعادة الحزمة السابقة كما هي فقط لنفس الكلمات (تشكيل، فراغات، ترتيب)،
+    # وإلا استخدامها كمسودة لاستدعاء تعديل أرخص فوق SEED (Jaccard فعلي). الفهرس داخل كل عملية ومحدود الحجم
+    SIMILAR_INDEX_ENABLED: bool = True
+    SIMILAR_SEED_THRESHOLD: float = 0.6
+    SIMILAR_INDEX_SIZE: int = 5000
+    SIMILAR_NUM_PERM: int = 64
+    SIMILAR_BANDS: int = 16
+
+    # التوليد الجماعي
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_CONCURRENCY: int = 8
+    BATCH_MAX_PACK_SIZE: int = 5
+
+    # بوابة استدعاءات النموذج (مشتركة بين كل العمال عبر SQLite محلي)
+    LIMITER_DB_PATH: str = "dominator_limiter.sqlite3"
+    LLM_RPM: int = 60
+    LLM_TPM: int = 1_000_000
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_MAX_QUEUE: int = 100
+    LLM_MAX_WAIT: float = 30.0
+    LLM_THROTTLE_COOLDOWN: float = 5.0
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_EXPECTED_OUTPUT_TOKENS: int = 2000
+
+    # طلبات احتياطية للتوليد: استدعاء ثانٍ (اختيارياً لنموذج بديل) إذا تجاوز الأول p95
+    HEDGE_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_DEFAULT_DELAY: float = 8.0
+    HEDGE_MIN_DELAY: float = 2.0
+    HEDGE_MAX_RATE: float = 0.1
+    HEDGE_FALLBACK_MODEL: str = ""
+
+    # طابور المهام الخلفية (الاستنساخ والرادار)
+    JOBS_DB_PATH: str = "dominator_jobs.sqlite3"
+    JOB_WORKERS: int = 4
+    JOB_POLL_INTERVAL: float = 2.0
+    # المهمة قيد التنفيذ تحدّث نبضها دورياً؛ تُعتبر عالقة بعد توقف النبض مدة أطول من JOB_DEADLINE
+    JOB_HEARTBEAT_INTERVAL: float = 30.0
+    JOB_STALE_AFTER: float = 1200.0
+    JOB_MAX_ATTEMPTS: int = 2
+    JOB_RETENTION: float = 7 * 86400
+
+    # سجل الطلبات (عدد مرات كل طلب): مصدر التسخين المسبق
+    HISTORY_DB_PATH: str = "dominator_history.sqlite3"
+    HISTORY_RETENTION: float = 30 * 86400
+    HISTORY_FLUSH_INTERVAL: float = 5.0
+
+    # التسخين المسبق (python -m app.prewarm): ملء كاش الهاشتاجات والرادار والتوليد قبل الذروة
+    # من PREWARM_TARGETS_PATH (JSON) أو من أكثر الطلبات تكراراً، داخل النوافذ الهادئة فقط
+    # (بتوقيت الخادم، مثل "02:00-06:00,14:00-15:00") وبنسبة محدودة من حصة النموذج
+    PREWARM_WINDOWS: str = "03:00-07:00"
+    PREWARM_INTERVAL: float = 1800.0
+    PREWARM_QUOTA_SHARE: float = 0.3
+    PREWARM_CONCURRENCY: int = 2
+    PREWARM_TARGETS_PATH: str = ""
+    PREWARM_HISTORY_TOP: int = 50
+    PREWARM_HISTORY_WINDOW: float = 7 * 86400
+    # المداخل التي تبقى صالحة أطول من هذا لا تُعاد (يجب أن تغطي فترة الذروة)؛
+    # لكل كاش لا يتجاوز نصف مدة صلاحيته، وإلا أُعيد جلب كل مدخل في كل دورة
+    PREWARM_FRESH_FOR: float = 4 * 3600
+    PREWARM_RETENTION: float = 7 * 86400
+
+    # رادار النيش: ملف DNA مجمّع من أفضل الفيديوهات
+    RADAR_TOP_N: int = 10
+    RADAR_PROFILE_TTL: float = 12 * 3600
+    RADAR_STALE_TTL: float = 7 * 86400
+    RADAR_TIMEOUT: float = 240.0
+    RADAR_ANALYSIS_CONCURRENCY: int = 4
+
     class Config:
         env_file = ".env"
 
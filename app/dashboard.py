@@ -1,8 +1,32 @@
+import html
 import streamlit as st
+from app.config import get_settings
 from app.schemas import DominanceRequest, CreatorDNA, Platform, ContentTone
-from app.engine import DominanceEngine
 
 st.set_page_config(page_title="AI DOMINATOR", page_icon="🦅", layout="wide")
+settings = get_settings()
+
+# المحرك يُحمّل مرة واحدة لكل عملية Streamlit وليس مع كل rerun
+# (داخل العملية، أو عبر الـ API عند ضبط DASHBOARD_ENGINE_URL)
+@st.cache_resource
+def get_engine():
+    from app.client import get_engine
+    return get_engine()
+
+# نفس المدخلات خلال الـ TTL = نفس الحزمة بدون استدعاء مدفوع جديد.
+# _refresh لا يدخل في مفتاح الكاش (البادئة _)؛ التحديث يغير nonce هذه المدخلات فقط
+@st.cache_data(ttl=settings.DASHBOARD_CACHE_TTL, max_entries=settings.DASHBOARD_CACHE_ENTRIES, show_spinner=False)
+def generate_pack(request_json: str, language: str, video_url: str, nonce: int, _refresh: bool = False) -> dict:
+    req = DominanceRequest.model_validate_json(request_json)
+    return get_engine().process(req, language=language, video_url=video_url, refresh=_refresh)
+
+# {(الطلب، اللغة، الرابط): nonce} مشترك بين الجلسات: بعد التحديث يرى الجميع الحزمة الجديدة
+@st.cache_resource
+def refresh_nonces() -> dict:
+    return {}
+
+if "result" not in st.session_state:
+    st.session_state.result = None
 
 TRANSLATIONS = {
     "English": {
@@ -36,6 +60,7 @@ with st.sidebar:
     audience = st.text_input(t['lbl_audience'], "Beginners")
     tone = st.selectbox("Tone", ["controversial", "educational", "storytelling"])
     platform = st.selectbox("Platform", ["tiktok", "instagram"])
+    refresh = st.checkbox("🔄 Force Refresh (skip cache)", value=False)
     btn = st.button(t['btn_exec'], type="primary", use_container_width=True)
 
 # CSS (نفس السابق)
@@ -54,6 +79,48 @@ col1, col2 = st.columns([1, 8])
 with col1: st.write("🦅")
 with col2: st.title("AI DOMINATOR // GLOBAL")
 
+def scene_html(s):
+    e = {k: html.escape(str(s.get(k, ""))) for k in ("time", "type", "text", "visual", "screen")}
+    return f"""
+    <div class="script-box">
+        <div style="color: #9ca3af; font-size: 0.8em;">⏱️ {e['time']} | {e['type']}</div>
+        <div style="font-size: 1.1em; margin: 5px 0; color: white;">{e['text']}</div>
+        <div style="margin-top: 10px;">
+            <span class="visual-tag">🎥 {e['visual']}</span><br>
+            <span class="screen-tag">📺 {e['screen'] or "---"}</span>
+        </div>
+    </div>
+    """
+
+def render_pack(data):
+    c1, c2 = st.columns([1, 2])
+    with c1: st.markdown(f'<div class="big-score">{html.escape(str(data["score_data"]["score"]))}%</div>', unsafe_allow_html=True)
+    with c2: 
+        fix_text = f"Fix: {data['score_data']['fix']}"
+        st.info(fix_text)
+        st.code(fix_text, language="text")
+
+    st.divider()
+    st.subheader(f"🪝 {t['res_hooks']}")
+    for h in data["hooks"]:
+        with st.container(border=True):
+            st.markdown(f"**{h['type']}**")
+            st.code(h["text"], language="text")
+            st.markdown(f"<span class='visual-tag'>👁️ {html.escape(str(h['visual']))}</span>", unsafe_allow_html=True)
+
+    st.divider()
+    st.subheader(f"📜 {t['res_script']}")
+    # السيناريو كله في عنصر HTML واحد بدل st.markdown لكل مشهد
+    st.markdown("".join(scene_html(s) for s in data["script"]), unsafe_allow_html=True)
+    full_text = "".join(f"[{s['time']}] {s['text']}\n" for s in data["script"])
+
+    st.markdown("👇 **Copy Full Script**")
+    st.code(full_text, language="text")
+    
+    st.divider()
+    st.subheader("#️⃣ Hashtags")
+    st.code(" ".join(data["hashtags"]), language="text")
+
 if btn:
     status_msg = "جاري سحب الـ DNA وتحليله..." if video_url else "جاري المعالجة..."
     with st.status(f"⚙️ {status_msg}", expanded=True) as status:
@@ -64,53 +131,22 @@ if btn:
             )
             
             # تمرير الرابط للمحرك
-            data = DominanceEngine.process(req, language=lang_code, video_url=video_url)
+            pack_key = (req.model_dump_json(), lang_code, video_url)
+            nonces = refresh_nonces()
+            if refresh:
+                nonces[pack_key] = nonces.get(pack_key, 0) + 1
+            data = generate_pack(*pack_key, nonces.get(pack_key, 0), _refresh=refresh)
+            st.session_state.result = {"pack": data, "language": lang_code}
             
             status.update(label="✅ Done!", state="complete", expanded=False)
-            
-            # (نفس كود عرض النتائج السابق تماماً)
-            # ...
-            # ...
-            # (أعد نسخ جزء عرض النتائج Score, Hooks, Script من الكود السابق هنا)
-            
-            c1, c2 = st.columns([1, 2])
-            with c1: st.markdown(f'<div class="big-score">{data.dominance_score.score}%</div>', unsafe_allow_html=True)
-            with c2: 
-                fix_text = f"Fix: {data.dominance_score.minimum_fix}"
-                st.info(fix_text)
-                st.code(fix_text, language="text")
-
-            st.divider()
-            st.subheader(f"🪝 {t['res_hooks']}")
-            for h in data.hooks:
-                with st.container(border=True):
-                    st.markdown(f"**{h.type}**")
-                    st.code(h.text, language="text")
-                    st.markdown(f"<span class='visual-tag'>👁️ {h.visual_cue}</span>", unsafe_allow_html=True)
-
-            st.divider()
-            st.subheader(f"📜 {t['res_script']}")
-            full_text = ""
-            for s in data.script_timeline:
-                full_text += f"[{s.time_start}] {s.script}\n"
-                st.markdown(f"""
-                <div class="script-box">
-                    <div style="color: #9ca3af; font-size: 0.8em;">⏱️ {s.time_start} | {s.type}</div>
-                    <div style="font-size: 1.1em; margin: 5px 0; color: white;">{s.script}</div>
-                    <div style="margin-top: 10px;">
-                        <span class="visual-tag">🎥 {s.visual_direction}</span><br>
-                        <span class="screen-tag">📺 {s.screen_text if s.screen_text else "---"}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-
-            st.markdown("👇 **Copy Full Script**")
-            st.code(full_text, language="text")
-            
-            st.divider()
-            st.subheader("#️⃣ Hashtags")
-            st.code(" ".join(data.hashtags), language="text")
 
         except Exception as e:
             status.update(label="❌ Error", state="error")
             st.error(str(e))
+
+# آخر حزمة تبقى معروضة عند أي تفاعل (تغيير اللغة، فتح حاوية...) بدون استدعاء جديد
+if st.session_state.result:
+    result = st.session_state.result
+    if result["language"] != lang_code:
+        st.caption(f"🌐 {result['language']}")
+    render_pack(result["pack"])
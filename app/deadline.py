@@ -0,0 +1,85 @@
+import math
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+class DeadlineExceeded(Exception):
+    """
+    انتهت ميزانية الطلب قبل اكتمال التوليد (504).
+    """
+
+class Deadline:
+    """
+    ميزانية زمنية واحدة لكل طلب تمر لكل المراحل: كل مهلة مرحلة تُقص إلى المتبقي،
+    والمراحل الاختيارية تترك DEADLINE_GENERATION_RESERVE للتوليد. التنازلات تُسجل لتظهر في الرد.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.degradations = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, reserve: float = 0.0) -> float:
+        # ما يمكن لمرحلة أن تستهلكه مع ترك reserve لما بعدها
+        return max(0.0, self.remaining() - reserve)
+
+    def extend(self, other: Optional["Deadline"]):
+        # ميزانية مشتركة (SingleFlight): تمتد إلى أبعد ميزانية بين أصحابها، وNone = بدون حد
+        expires_at = math.inf if other is None else other.expires_at
+        if expires_at > self.expires_at:
+            self.seconds += expires_at - self.expires_at
+            self.expires_at = expires_at
+
+    def degrade(self, what: str):
+        if what not in self.degradations:
+            self.degradations.append(what)
+
+_current = ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+def set_deadline(deadline: Optional[Deadline]):
+    # المهام الفرعية (asyncio) ترث الميزانية تلقائياً عبر الـ context
+    _current.set(deadline)
+
+def stage_timeout(timeout: float, reserve: float = 0.0) -> float:
+    deadline = _current.get()
+    if deadline is None:
+        return timeout
+    return min(timeout, deadline.budget(reserve))
+
+async def wait_stage(aw, timeout: float, reserve: float = 0.0):
+    """
+    مثل asyncio.wait_for(aw, stage_timeout(timeout, reserve)) لكن حد الميزانية يُقرأ من جديد عند
+    انتهائه: لو امتدت الميزانية أثناء المرحلة (منتظر أطول انضم لـ SingleFlight) تكمل المرحلة.
+    """
+    task = asyncio.ensure_future(aw)
+    stage_ends = time.monotonic() + timeout
+    try:
+        while True:
+            limit = min(stage_ends - time.monotonic(), stage_timeout(timeout, reserve))
+            if limit <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({task}, timeout=limit)
+            if done:
+                return task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+def default_deadline(slow: bool = False) -> Deadline:
+    # الاستنساخ والرادار (مهام خلفية ولوحة التحكم) يحتاجان ميزانية أطول من طلب HTTP عادي
+    return Deadline(settings.JOB_DEADLINE if slow else settings.REQUEST_DEADLINE)
+
+def degrade(what: str):
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.degrade(what)
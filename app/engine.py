@@ -1,102 +1,183 @@
 import json
-import requests
+import asyncio
+import threading
+import queue
 import os
 import time
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from apify_client import ApifyClient
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from app.config import get_settings
+from app.models import MODEL_NAME, DNA_MODEL_NAME, JSON_CONFIG, get_model, get_safety_settings
 from app.schemas import DominanceRequest
-from app.prompts import generate_user_prompt, generate_dna_analysis_prompt
+from app.prompts import (
+    generate_user_prompt, generate_dna_analysis_prompt, generate_batch_prompt, generate_section_prompt,
+    generate_translate_prompt, generate_refine_prompt, DOMINATOR_SYSTEM_PROMPT, PROMPT_VERSION,
+)
+from app.cache import TieredCache, make_key
+from app.hashtags import hashtag_provider
+from app.limiter import llm_limiter, estimate_tokens, LimiterOverloaded
+from app.streaming import IncrementalJSONParser
+from app.normalizer import (
+    pick, normalize_response, normalize_score, normalize_hook, normalize_scene, TOP_LEVEL_ALIASES
+)
+from app.salvage import salvage_json, missing_sections
+from app.translate import extract_text, apply_text, pick_translation
+from app.similarity import TopicIndex, topic_words, jaccard
+from app.history import request_history
+from app.singleflight import SingleFlight
+from app.hedging import Hedger
+from app.deadline import (
+    Deadline, DeadlineExceeded, current_deadline, set_deadline, stage_timeout, wait_stage, default_deadline, degrade,
+)
+from app.tiktok import is_tiktok_url, resolve_video_id, canonical_video_url
+from app.telemetry import get_logger, span, record_usage, CACHE_LOOKUPS
 
 settings = get_settings()
-genai.configure(api_key=settings.GOOGLE_API_KEY)
+log = get_logger("engine")
 
-# نستخدم هذا النموذج حصراً لاستقراره
-MODEL_NAME = "gemini-flash-latest"
+generation_cache = TieredCache(
+    "generation",
+    ttl=settings.GENERATION_CACHE_TTL,
+    memory_size=settings.GENERATION_CACHE_MEMORY_SIZE,
+    disk_size=settings.GENERATION_CACHE_DISK_SIZE,
+)
+
+# نفس الطلب بلغات مختلفة: {اللغة: مفتاح الكاش} حتى تُترجم الحزمة الموجودة بدل توليدها من جديد
+variant_cache = TieredCache(
+    "pack_variants",
+    ttl=settings.GENERATION_CACHE_TTL,
+    memory_size=settings.GENERATION_CACHE_MEMORY_SIZE,
+    disk_size=settings.GENERATION_CACHE_DISK_SIZE,
+)
+
+# المواضيع السابقة (مفتاح الكاش -> الموضوع) للطلبات التي تختلف عنها في الصياغة فقط
+topic_index = TopicIndex(
+    num_perm=settings.SIMILAR_NUM_PERM, bands=settings.SIMILAR_BANDS, max_entries=settings.SIMILAR_INDEX_SIZE
+)
+
+# نص + DNA لكل فيديو، مع تخزين سلبي قصير للفيديوهات التي فشل سحبها
+dna_cache = TieredCache("viral_dna", ttl=settings.DNA_CACHE_TTL, memory_size=512, disk_size=20000)
+
+# دمج الطلبات المتطابقة الجارية (نفس مفتاح التوليد / نفس رقم الفيديو)
+generation_flight = SingleFlight("generation")
+dna_flight = SingleFlight("viral_dna")
+
+# تتبع زمن التوليد الرئيسي وتكرار الاستدعاءات البطيئة (HEDGE_ENABLED)
+generation_hedger = Hedger("generation")
+
+# القيمة الاحتياطية عند فشل التحليل (لا تُحفظ في الكاش)
+DNA_FALLBACK = "Viral Structure Analysis"
+
+# مرحلة لم تكتمل بسبب المهلة أو الميزانية (تختلف عن نتيجة فارغة فعلية)
+SKIPPED = object()
 
 # --- دوال المساعدة ---
-def recursive_lowercase(obj):
-    if isinstance(obj, dict):
-        return {k.lower(): recursive_lowercase(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [recursive_lowercase(element) for element in obj]
-    else:
-        return obj
+# تحويل أجزاء البث إلى نفس هيكل الحزمة النهائية
+PIECE_NORMALIZERS = {"score": normalize_score, "hook": normalize_hook, "scene": normalize_scene}
 
-def normalize_response(data, real_hashtags):
+def pack_events(pack: dict):
     """
-    مصفاة البيانات: تضمن تحويل أي هيكل يرسله الذكاء إلى الهيكل القياسي للواجهة.
+    تفكيك حزمة جاهزة (من الكاش) إلى نفس أحداث البث.
     """
-    # 1. توحيد السكور
-    raw_score = data.get("score_data", data.get("dominance_score", {}))
-    final_score = {"score": 85, "why": ["Analysis pending"], "fix": "Check manually"}
-    
-    if isinstance(raw_score, dict):
-        final_score["score"] = raw_score.get("score", 85)
-        final_score["why"] = raw_score.get("why", ["Good potential"])
-        final_score["fix"] = raw_score.get("fix", raw_score.get("minimum_fix", "Optimize hooks"))
-    elif isinstance(raw_score, (int, float)):
-        final_score["score"] = int(raw_score)
-
-    # 2. توحيد السكريبت (نبحث عن كل الاحتمالات)
-    raw_script = data.get("script", data.get("script_timeline", data.get("timeline", [])))
-    final_script = []
-    if isinstance(raw_script, list):
-        for s in raw_script:
-            if isinstance(s, dict):
-                final_script.append({
-                    "time": s.get("time", s.get("time_start", "00:00")),
-                    "type": s.get("type", "Scene"),
-                    "text": s.get("text", s.get("script", "...")),
-                    "screen": s.get("screen", s.get("screen_text", "")),
-                    "visual": s.get("visual", s.get("visual_direction", "..."))
-                })
-
-    # 3. توحيد الخطافات
-    raw_hooks = data.get("hooks", [])
-    final_hooks = []
-    if isinstance(raw_hooks, list):
-        for h in raw_hooks:
-            if isinstance(h, dict):
-                final_hooks.append({
-                    "type": h.get("type", "Hook"),
-                    "text": h.get("text", "..."),
-                    "visual": h.get("visual", h.get("visual_cue", "..."))
-                })
-
-    # 4. الهاشتاجات
-    ai_hashtags = data.get("hashtags", [])
-    final_hashtags = real_hashtags if real_hashtags else (ai_hashtags if isinstance(ai_hashtags, list) else [])
-
-    return {
-        "score_data": final_score,
-        "hooks": final_hooks,
-        "script": final_script,
-        "hashtags": final_hashtags,
-        "caption": data.get("caption", "Watch this!"),
-        "flex": data.get("flex", data.get("viral_flex_text", "AI Dominator"))
-    }
+    yield {"event": "score", "data": pack["score_data"]}
+    for h in pack["hooks"]:
+        yield {"event": "hook", "data": h}
+    for s in pack["script"]:
+        yield {"event": "scene", "data": s}
+    yield {"event": "pack", "data": pack}
+
+def generation_cache_key(request: DominanceRequest, language: str, reference_dna: str = None) -> str:
+    return make_key(
+        PROMPT_VERSION, MODEL_NAME,
+        request.topic_or_keyword, request.tone.value, request.dna.niche,
+        request.dna.target_audience, language, reference_dna,
+    )
+
+def variant_key(request: DominanceRequest, reference_dna: str = None) -> str:
+    return generation_cache_key(request, "*", reference_dna)
+
+def similarity_scope(request: DominanceRequest, language: str, reference_dna: str = None) -> str:
+    # كل حقول مفتاح التوليد ما عدا الموضوع
+    return make_key(
+        PROMPT_VERSION, MODEL_NAME, request.tone.value, request.dna.niche,
+        request.dna.target_audience, language, reference_dna,
+    )
+
+async def astore_pack(request: DominanceRequest, language: str, reference_dna: str, cache_key: str, pack: dict):
+    await generation_cache.aset(cache_key, pack, ttl=degraded_ttl())
+    topic_index.add(cache_key, request.topic_or_keyword, similarity_scope(request, language, reference_dna), request.topic_or_keyword)
+    key = variant_key(request, reference_dna)
+    variants = await variant_cache.aget(key) or {}
+    if variants.get(language) != cache_key:
+        variants[language] = cache_key
+        await variant_cache.aset(key, variants)
+
+async def afind_variant(request: DominanceRequest, language: str, reference_dna: str = None):
+    """
+    (اللغة، الحزمة) لنفس الطلب بلغة أخرى إن كانت في الكاش.
+    """
+    for other, key in (await variant_cache.aget(variant_key(request, reference_dna)) or {}).items():
+        if other != language:
+            pack = await generation_cache.aget(key)
+            if pack is not None:
+                return other, pack
+    return None
+
+async def afind_similar(request: DominanceRequest, language: str, reference_dna: str = None):
+    """
+    (التشابه، الموضوع السابق، الحزمة) لأقرب طلب سابق فوق SIMILAR_SEED_THRESHOLD، أو None.
+    الفهرس يرشح المرشحين بالتقدير، والترتيب بـ Jaccard الفعلي (نفس الكلمات أولاً).
+    المداخل التي انتهت حزمتها من الكاش تُحذف من الفهرس.
+    """
+    if not settings.SIMILAR_INDEX_ENABLED:
+        return None
+    topic = request.topic_or_keyword
+    words = topic_words(topic)
+    candidates = []
+    for _, key, source_topic in topic_index.query(
+        topic, similarity_scope(request, language, reference_dna), settings.SIMILAR_SEED_THRESHOLD
+    ):
+        similarity = jaccard(topic, source_topic)
+        if similarity >= settings.SIMILAR_SEED_THRESHOLD:
+            candidates.append((topic_words(source_topic) == words, similarity, key, source_topic))
+    for same_words, similarity, key, source_topic in sorted(candidates, key=lambda c: c[:2], reverse=True):
+        pack = await generation_cache.aget(key)
+        if pack is None:
+            topic_index.discard(key)
+            continue
+        CACHE_LOOKUPS.labels(cache="similar_topic", result="reuse" if same_words else "seed").inc()
+        return similarity, source_topic, pack
+    CACHE_LOOKUPS.labels(cache="similar_topic", result="miss").inc()
+    return None
+
+def is_same_topic(topic: str, source_topic: str) -> bool:
+    # إعادة الحزمة كما هي فقط لنفس الكلمات؛ أي كلمة مختلفة (5 مقابل 10، "لا") تغير المعنى
+    return topic_words(topic) == topic_words(source_topic)
 
 def fetch_external_hashtags(keyword: str):
-    api_key = os.getenv("RAPID_API_KEY")
-    if not api_key: return [] 
-    try:
-        url = "https://rocketapi-for-tiktok.p.rapidapi.com/hashtags/search"
-        headers = {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": "rocketapi-for-tiktok.p.rapidapi.com"}
-        response = requests.get(url, headers=headers, params={"keyword": keyword}, timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            return [f"#{tag['name']}" for tag in data.get('hashtags', [])[:10]]
-    except: return []
-    return []
+    return run_sync(hashtag_provider.get(keyword))
+
+async def afetch_external_hashtags(keyword: str):
+    return await hashtag_provider.get(keyword)
+
+def prefetch_hashtags(niche: str) -> asyncio.Task:
+    # بدء الجلب مبكراً فقط: لا مهلة ولا تنازل هنا، فالمهلة تُطبق عند انتظار النتيجة (await_hashtags)
+    return asyncio.ensure_future(afetch_external_hashtags(niche))
+
+async def await_hashtags(niche: str) -> list:
+    """
+    نتيجة الجلب الذي بدأه prefetch_hashtags (المزود يدمج الطلب الجاري أو يعيد الكاش)،
+    والتنازل hashtags_timeout يُسجل فقط إذا لم تصل حتى هذه اللحظة.
+    """
+    return await run_stage(
+        "hashtags", afetch_external_hashtags(niche), settings.HASHTAG_TIMEOUT, default=[],
+        reserve=settings.DEADLINE_MIN_REPAIR
+    )
 
 def scrape_tiktok_dna(video_url: str):
     token = os.getenv("APIFY_TOKEN")
     if not token or not video_url: return None
     try:
-        print(f"📡 Radar Scanning: {video_url}")
+        log.info("📡 Radar Scanning", url=video_url)
+        from apify_client import ApifyClient
         client = ApifyClient(token)
         run_input = {"urls": [video_url], "shouldDownloadVideos": False}
         run = client.actor("clockworks/tiktok-scraper").call(run_input=run_input)
@@ -104,39 +185,283 @@ def scrape_tiktok_dna(video_url: str):
         if dataset_items:
             return dataset_items[0].get("text", "") 
     except Exception as e:
-        print(f"⚠️ Radar Error: {e}")
+        log.warning("⚠️ Radar Error", url=video_url, error=str(e))
+        return None
+    return None
+
+async def arun_tiktok_scraper(run_input: dict, timeout: float = None) -> list:
+    """
+    تشغيل واحد للـ actor يعيد كل العناصر (فيديو واحد أو دفعة كاملة).
+    timeout يوقف الـ actor نفسه على Apify وليس انتظارنا فقط.
+    """
+    token = os.getenv("APIFY_TOKEN")
+    if not token: return []
+    from apify_client import ApifyClientAsync
+    client = ApifyClientAsync(token)
+    run = await client.actor("clockworks/tiktok-scraper").call(
+        run_input={"shouldDownloadVideos": False, **run_input},
+        timeout_secs=max(1, int(timeout)) if timeout else None,
+    )
+    return (await client.dataset(run["defaultDatasetId"]).list_items()).items
+
+async def ascrape_tiktok_dna(video_url: str):
+    if not os.getenv("APIFY_TOKEN") or not video_url: return None
+    try:
+        log.info("📡 Radar Scanning", url=video_url)
+        dataset_items = await arun_tiktok_scraper(
+            {"urls": [video_url]}, timeout=stage_timeout(settings.SCRAPE_TIMEOUT, settings.DEADLINE_GENERATION_RESERVE)
+        )
+        if dataset_items:
+            return dataset_items[0].get("text", "")
+    except Exception as e:
+        log.warning("⚠️ Radar Error", url=video_url, error=str(e))
         return None
     return None
 
 def analyze_dna_with_ai(transcript: str):
+    return run_sync(aanalyze_dna_with_ai(transcript))
+
+async def aanalyze_dna_with_ai(transcript: str):
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        prompt = generate_dna_analysis_prompt(transcript)
-        response = model.generate_content(prompt)
+        model = get_model(DNA_MODEL_NAME)
+        prompt = generate_dna_analysis_prompt(transcript, settings.DNA_TRANSCRIPT_TOKEN_BUDGET)
+        response = await llm_limiter.run(lambda: model.generate_content_async(prompt), estimate_tokens(prompt))
+        record_usage(response, DNA_MODEL_NAME, call="dna")
         return response.text
-    except:
-        return "Viral Structure Analysis"
+    except Exception:
+        return DNA_FALLBACK
+
+async def aclone_viral_dna(video_url: str):
+    """
+    سحب وتحليل الفيديو مرة واحدة فقط لكل رقم فيديو مهما اختلفت صيغة الرابط.
+    """
+    video_id = await resolve_video_id(video_url)
+    cache_key = f"tiktok:{video_id}" if video_id else make_key(video_url.split("?")[0])
+    scrape_url = canonical_video_url(video_id) if video_id else video_url
+
+    cached = await dna_cache.aget(cache_key) or {}
+    if cached.get("dna"):
+        return cached["dna"]
+    if cached.get("failed"):
+        return None
+
+    return await dna_flight.do(cache_key, lambda: _afetch_viral_dna(cache_key, scrape_url, cached.get("transcript")))
+
+async def _afetch_viral_dna(cache_key: str, scrape_url: str, transcript: str = None):
+    if not transcript:
+        transcript = await run_stage("scrape", ascrape_tiktok_dna(scrape_url), settings.SCRAPE_TIMEOUT, default=SKIPPED)
+        if transcript is SKIPPED:
+            # نفدت المهلة أو الميزانية: لا نخزنه كفشل
+            return None
+        if not transcript:
+            if os.getenv("APIFY_TOKEN"):
+                await dna_cache.aset(cache_key, {"failed": True}, ttl=settings.DNA_NEGATIVE_TTL)
+            return None
+
+    dna = await run_stage("dna", aanalyze_dna_with_ai(transcript), settings.DNA_TIMEOUT)
+    valid = bool(dna) and dna != DNA_FALLBACK
+    await dna_cache.aset(cache_key, {"transcript": transcript, "dna": dna if valid else None})
+    return dna
+
+async def run_stage(name: str, coro, timeout: float, default=None, reserve: float = None):
+    """
+    تشغيل مرحلة اختيارية بمهلة خاصة بها (مقصوصة إلى ميزانية الطلب مع ترك reserve
+    للتوليد)، وإرجاع القيمة الافتراضية عند التجاوز أو عند عدم وجود وقت كافٍ لها أصلاً.
+    """
+    reserve = settings.DEADLINE_GENERATION_RESERVE if reserve is None else reserve
+    with span(name) as info:
+        if stage_timeout(timeout, reserve) <= 0:
+            coro.close()
+            info["status"] = "skipped"
+            degrade(f"{name}_skipped")
+            log.warning("⏭️ Stage Skipped", stage=name)
+            return default
+        try:
+            return await wait_stage(coro, timeout, reserve)
+        except asyncio.TimeoutError:
+            info["status"] = "timeout"
+            degrade(f"{name}_timeout")
+            log.warning("⏱️ Stage Timeout", stage=name, timeout=timeout)
+            return default
+
+# حلقة أحداث خلفية واحدة يستخدمها المستدعون المتزامنون (مثل Streamlit)
+_background_loop = None
+_background_lock = threading.Lock()
+
+def background_loop():
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="dominator-loop", daemon=True).start()
+    return _background_loop
+
+def run_sync(coro):
+    return asyncio.run_coroutine_threadsafe(coro, background_loop()).result()
+
+_STREAM_END = object()
+
+def iterate_sync(agen):
+    """
+    استهلاك مولّد غير متزامن من كود متزامن (Streamlit) عبر حلقة الخلفية.
+    المولّد كله يعمل داخل مهمة واحدة فيبقى سياقه (المهلة ومعرّف التتبع) ثابتاً بين الأحداث.
+    """
+    events = queue.SimpleQueue()
+
+    async def drive():
+        try:
+            async for item in agen:
+                events.put((item, None))
+        except BaseException as exc:
+            events.put((_STREAM_END, exc))
+            raise
+        events.put((_STREAM_END, None))
+
+    future = asyncio.run_coroutine_threadsafe(drive(), background_loop())
+    try:
+        while True:
+            item, error = events.get()
+            if item is _STREAM_END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # المستهلك توقف مبكراً: إلغاء المهمة يغلق المولّد داخل حلقته
+        future.cancel()
+
+def degraded_ttl():
+    # الحزمة الناقصة (هاشتاجات أو أقسام) تبقى في الكاش مدة قصيرة فقط
+    deadline = current_deadline()
+    return settings.DEGRADED_CACHE_TTL if deadline is not None and deadline.degradations else None
+
+def is_complete_response(response) -> bool:
+    try:
+        data = salvage_json(response.text)
+    except Exception:
+        return False
+    return isinstance(data, dict) and not missing_sections(data)
+
+def build_generation_model():
+    # النموذج والإعدادات يُبنيان مرة واحدة ويعاد استخدامهما (app/models.py)
+    # والمخطط الثابت (JSON schema) يُرسل كتعليمات نظام بدل تكراره في كل برومبت
+    return get_model(MODEL_NAME, JSON_CONFIG, DOMINATOR_SYSTEM_PROMPT), get_safety_settings()
 
 class DominanceEngine:
     
-    # إعادة المحاولة تلقائياً عند خطأ 429 (انتظار متصاعد)
     @staticmethod
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def generate_with_retry(model, prompt, safety):
-        return model.generate_content(prompt, safety_settings=safety)
+        return run_sync(DominanceEngine.agenerate_with_retry(model, prompt, safety))
+
+    # كل الاستدعاءات تمر عبر البوابة المشتركة: 429 يخفض التوازي في كل العمال بدل عاصفة إعادة محاولات
+    @staticmethod
+    async def agenerate_with_retry(model, prompt, safety, call: str = "generation"):
+        response = await llm_limiter.run(
+            lambda: model.generate_content_async(prompt, safety_settings=safety), estimate_tokens(prompt)
+        )
+        record_usage(response, getattr(model, "model_name", MODEL_NAME), call=call)
+        return response
+
+    @staticmethod
+    async def agenerate_hedged(model, prompt, safety):
+        """
+        الاستدعاء الرئيسي مع طلب احتياطي بعد p95 (لنفس النموذج أو HEDGE_FALLBACK_MODEL).
+        الفائز أول رد يحتوي الأقسام الثلاثة.
+        """
+        if not settings.HEDGE_ENABLED:
+            return await DominanceEngine.agenerate_with_retry(model, prompt, safety)
+        backup = model
+        if settings.HEDGE_FALLBACK_MODEL:
+            backup = get_model(settings.HEDGE_FALLBACK_MODEL, JSON_CONFIG, DOMINATOR_SYSTEM_PROMPT)
+        return await generation_hedger.run(
+            lambda: DominanceEngine.agenerate_with_retry(model, prompt, safety),
+            lambda: DominanceEngine.agenerate_with_retry(backup, prompt, safety, call="hedge"),
+            is_complete_response,
+            has_capacity=lambda: llm_limiter.in_flight < int(llm_limiter.limit),
+        )
+
+    # إعادة المحاولة تشمل فتح البث فقط، وليس ما بعد وصول أول جزء
+    @staticmethod
+    async def astart_stream(model, prompt, safety):
+        return await llm_limiter.run(
+            lambda: model.generate_content_async(prompt, safety_settings=safety, stream=True), estimate_tokens(prompt)
+        )
 
     @staticmethod
-    def process(request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False) -> dict:
-        
-        reference_dna = None
-        
+    def process(request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False, refresh: bool = False, deadline: Deadline = None) -> dict:
+        return run_sync(DominanceEngine.aprocess(request, language=language, video_url=video_url, radar_mode=radar_mode, refresh=refresh, deadline=deadline))
+
+    @staticmethod
+    async def resolve_reference_dna(request: DominanceRequest, video_url: str = None, radar_mode: bool = False):
         if radar_mode:
-            reference_dna = f"Analyze patterns for niche: {request.dna.niche}"
-        elif video_url and "tiktok" in video_url:
-            transcript = scrape_tiktok_dna(video_url)
-            if transcript:
-                reference_dna = analyze_dna_with_ai(transcript)
-        
+            from app.radar import aget_niche_dna
+            profile = await run_stage("radar", aget_niche_dna(request.dna.niche), settings.RADAR_TIMEOUT)
+            return profile or f"Analyze patterns for niche: {request.dna.niche}"
+        if video_url and is_tiktok_url(video_url):
+            return await aclone_viral_dna(video_url)
+        return None
+
+    @staticmethod
+    async def aprocess(request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False, refresh: bool = False, deadline: Deadline = None) -> dict:
+        """
+        النسخة غير المتزامنة من process: كل عمليات الشبكة لا تحجز الـ event loop.
+        refresh=True يتجاوز الكاش ويولّد نسخة جديدة تحل محل القديمة.
+        deadline: ميزانية الطلب كاملاً (الافتراضي من Settings)، وتنازلاتها في deadline.degradations.
+        """
+        deadline = deadline or default_deadline(slow=bool(video_url or radar_mode))
+        set_deadline(deadline)
+        with span("process", mode="radar" if radar_mode else "clone" if video_url else "plain"):
+            try:
+                return await asyncio.wait_for(
+                    DominanceEngine._aprocess(request, language, video_url, radar_mode, refresh), deadline.remaining()
+                )
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Request deadline of {deadline.seconds:g}s exceeded")
+
+    @staticmethod
+    async def _aprocess(request: DominanceRequest, language: str, video_url: str, radar_mode: bool, refresh: bool) -> dict:
+        if not video_url:
+            # مصدر التسخين المسبق (app.prewarm)؛ الاستنساخ خاص بفيديو واحد فلا يُسجل
+            request_history.record(request, language, radar_mode)
+        # الهاشتاجات تعتمد على النيش فقط: تبدأ فوراً ولا ننتظرها إلا عند التجميع النهائي
+        hashtags_task = prefetch_hashtags(request.dna.niche)
+
+        try:
+            reference_dna = await DominanceEngine.resolve_reference_dna(request, video_url, radar_mode)
+
+            cache_key = generation_cache_key(request, language, reference_dna)
+            if not refresh:
+                cached = await generation_cache.aget(cache_key)
+                if cached is not None:
+                    return cached
+
+                # نفس الحزمة موجودة بلغة أخرى: ترجمة فقط بدل توليد إبداعي كامل
+                variant = await afind_variant(request, language, reference_dna) if settings.TRANSLATE_VARIANTS else None
+                if variant is not None:
+                    return await generation_flight.do(
+                        cache_key, lambda: DominanceEngine.atranslate_or_generate(request, language, reference_dna, cache_key, *variant)
+                    )
+
+                # موضوع قريب من طلب سابق: إعادة حزمته أو تعديلها بدل توليد كامل
+                similar = await afind_similar(request, language, reference_dna)
+                if similar is not None:
+                    return await generation_flight.do(
+                        cache_key, lambda: DominanceEngine.areuse_similar(request, language, reference_dna, cache_key, *similar)
+                    )
+
+            # الطلبات المتطابقة المتزامنة تنتظر نفس الاستدعاء بدل استدعاءات مكررة
+            return await generation_flight.do(
+                cache_key, lambda: DominanceEngine.agenerate_pack(request, language, reference_dna, cache_key)
+            )
+        finally:
+            hashtags_task.cancel()
+
+    @staticmethod
+    async def agenerate_pack(request: DominanceRequest, language: str, reference_dna: str, cache_key: str) -> dict:
+        """
+        استدعاء النموذج وتوحيد الحزمة وحفظها. لا يعتمد على أي حالة خاصة بطلب معين
+        حتى يمكن مشاركته بين الطلبات المدموجة.
+        """
         user_prompt = generate_user_prompt(
             topic=request.topic_or_keyword,
             tone=request.tone.value,
@@ -145,34 +470,403 @@ class DominanceEngine:
             language=language,
             reference_dna=reference_dna
         )
-        
-        real_hashtags = fetch_external_hashtags(request.dna.niche)
-
-        print(f"🚀 Engaging: {MODEL_NAME}")
-        model = genai.GenerativeModel(model_name=MODEL_NAME, generation_config={"response_mime_type": "application/json"})
-        
-        safety = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
-        
-        # استخدام دالة إعادة المحاولة
+
+        log.info("🚀 Engaging", model=MODEL_NAME)
+        model, safety = build_generation_model()
+
         try:
-            response = DominanceEngine.generate_with_retry(model, user_prompt, safety)
-            text_content = response.text.replace("```json", "").replace("```", "").strip()
-            raw_data = json.loads(text_content)
-            
-            # 1. توحيد حالة الأحرف
-            lowered_data = recursive_lowercase(raw_data)
-            
-            # 2. تصفية وتوحيد الهيكل (الحل النهائي للفراغات)
-            final_data = normalize_response(lowered_data, real_hashtags)
-            
+            with span("generation"):
+                response = await wait_stage(
+                    DominanceEngine.agenerate_hedged(model, user_prompt, safety), settings.GENERATION_TIMEOUT
+                )
+            # جلب الهاشتاجات بدأ مع بداية الطلب؛ هنا نستلم نتيجته من المزود (كاش أو جلب جارٍ)
+            real_hashtags = await await_hashtags(request.dna.niche)
+            final_data = await DominanceEngine.acomplete_pack(response.text, request, language, reference_dna, real_hashtags)
+            await astore_pack(request, language, reference_dna, cache_key, final_data)
             return final_data
 
+        except (LimiterOverloaded, DeadlineExceeded):
+            raise
+        except asyncio.TimeoutError:
+            deadline = current_deadline()
+            if deadline is not None and deadline.remaining() <= 0:
+                raise DeadlineExceeded("Request deadline exceeded during generation")
+            log.error("❌ Critical Error", error="generation timeout")
+            raise ValueError("System Overload or API Limit. Try again in 10s. Error: generation timed out")
         except Exception as e:
-            print(f"❌ Critical Error: {e}")
+            log.error("❌ Critical Error", error=str(e))
             raise ValueError(f"System Overload or API Limit. Try again in 10s. Error: {str(e)}")
 
+    @staticmethod
+    async def atranslate_pack(pack: dict, source_language: str, target_languages: list) -> dict:
+        """
+        استدعاء ترجمة واحد لكل اللغات المطلوبة: النصوص فقط، والهيكل (السكور، التوقيتات،
+        الهاشتاجات) يُنسخ من الحزمة الأصلية. يعيد {اللغة: الحزمة} لما نجح فقط.
+        """
+        prompt = generate_translate_prompt(
+            json.dumps(extract_text(pack), ensure_ascii=False), source_language, target_languages
+        )
+        # بدون تعليمات النظام: مخطط الحزمة الكاملة لا يناسب رد الترجمة
+        model = get_model(MODEL_NAME, JSON_CONFIG)
+        with span("translate", languages=len(target_languages)):
+            response = await wait_stage(
+                DominanceEngine.agenerate_with_retry(model, prompt, get_safety_settings(), call="translate"),
+                settings.GENERATION_TIMEOUT,
+            )
+        data = salvage_json(response.text)
+        if not isinstance(data, dict):
+            raise ValueError("Translation output is not a JSON object")
+        translations = data.get("translations")
+        if not isinstance(translations, dict):
+            # لغة واحدة: قد يعيد النموذج الشكل مباشرة بدون "translations"
+            translations = {target_languages[0]: data} if len(target_languages) == 1 else {}
+
+        packs = {}
+        for language in target_languages:
+            text = pick_translation(translations, language)
+            if not isinstance(text, dict):
+                continue
+            try:
+                packs[language] = apply_text(pack, text)
+            except ValueError as e:
+                log.warning("⚠️ Translation Shape Error", language=language, error=str(e))
+        return packs
+
+    @staticmethod
+    async def atranslate_or_generate(request: DominanceRequest, language: str, reference_dna: str, cache_key: str,
+                                     source_language: str, source: dict) -> dict:
+        try:
+            translated = await DominanceEngine.atranslate_pack(source, source_language, [language])
+        except (LimiterOverloaded, DeadlineExceeded):
+            raise
+        except Exception as e:
+            log.warning("⚠️ Translation Error", language=language, error=str(e))
+            translated = {}
+        if language not in translated:
+            return await DominanceEngine.agenerate_pack(request, language, reference_dna, cache_key)
+        log.info("🌐 Translated variant", source=source_language, target=language)
+        await astore_pack(request, language, reference_dna, cache_key, translated[language])
+        return translated[language]
+
+    @staticmethod
+    async def arefine_pack(pack: dict, source_topic: str, request: DominanceRequest, language: str) -> dict:
+        """
+        تعديل حزمة موضوع قريب إلى الموضوع الجديد: النصوص فقط تمر عبر النموذج
+        (مثل الترجمة)، والتوقيتات والسكور والهاشتاجات من الحزمة الأصلية.
+        """
+        prompt = generate_refine_prompt(
+            json.dumps(extract_text(pack), ensure_ascii=False), source_topic,
+            topic=request.topic_or_keyword, niche=request.dna.niche, audience=request.dna.target_audience,
+            tone=request.tone.value, language=language,
+        )
+        model = get_model(MODEL_NAME, JSON_CONFIG)
+        with span("refine"):
+            response = await wait_stage(
+                DominanceEngine.agenerate_with_retry(model, prompt, get_safety_settings(), call="refine"),
+                settings.GENERATION_TIMEOUT,
+            )
+        data = salvage_json(response.text)
+        if not isinstance(data, dict):
+            raise ValueError("Refinement output is not a JSON object")
+        return apply_text(pack, data)
+
+    @staticmethod
+    async def areuse_similar(request: DominanceRequest, language: str, reference_dna: str, cache_key: str,
+                             similarity: float, source_topic: str, source: dict) -> dict:
+        if is_same_topic(request.topic_or_keyword, source_topic):
+            log.info("♻️ Reused similar topic", similarity=round(similarity, 2), source=source_topic)
+            # بدون إضافة للفهرس: التشابه يُقاس دائماً مع الموضوع الذي وُلّدت له الحزمة فعلاً
+            await generation_cache.aset(cache_key, source, ttl=degraded_ttl())
+            return source
+        try:
+            refined = await DominanceEngine.arefine_pack(source, source_topic, request, language)
+        except (LimiterOverloaded, DeadlineExceeded):
+            raise
+        except Exception as e:
+            log.warning("⚠️ Refinement Error", similarity=round(similarity, 2), error=str(e))
+            return await DominanceEngine.agenerate_pack(request, language, reference_dna, cache_key)
+        log.info("🌱 Seeded from similar topic", similarity=round(similarity, 2), source=source_topic)
+        await astore_pack(request, language, reference_dna, cache_key, refined)
+        return refined
+
+    @staticmethod
+    async def aprocess_languages(request: DominanceRequest, languages: list, video_url: str = None, radar_mode: bool = False, refresh: bool = False, deadline: Deadline = None) -> dict:
+        """
+        نفس الحزمة بعدة لغات: توليد إبداعي واحد (أو حزمة موجودة في الكاش) ثم استدعاء ترجمة
+        واحد لكل اللغات الباقية. يعيد {اللغة: الحزمة} بنفس ترتيب languages.
+        """
+        deadline = deadline or default_deadline(slow=bool(video_url or radar_mode))
+        set_deadline(deadline)
+        with span("process", mode="languages"):
+            try:
+                return await asyncio.wait_for(
+                    DominanceEngine._aprocess_languages(request, list(dict.fromkeys(languages)), video_url, radar_mode, refresh),
+                    deadline.remaining(),
+                )
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Request deadline of {deadline.seconds:g}s exceeded")
+
+    @staticmethod
+    async def _aprocess_languages(request: DominanceRequest, languages: list, video_url: str, radar_mode: bool, refresh: bool) -> dict:
+        reference_dna = await DominanceEngine.resolve_reference_dna(request, video_url, radar_mode)
+        keys = {language: generation_cache_key(request, language, reference_dna) for language in languages}
+
+        packs = {}
+        if not refresh:
+            for language, key in keys.items():
+                cached = await generation_cache.aget(key)
+                if cached is not None:
+                    packs[language] = cached
+        missing = [language for language in languages if language not in packs]
+        if not missing:
+            return packs
+
+        if packs:
+            source_language = next(iter(packs))
+        else:
+            source_language = missing.pop(0)
+            packs[source_language] = await generation_flight.do(
+                keys[source_language],
+                lambda: DominanceEngine.agenerate_pack(request, source_language, reference_dna, keys[source_language]),
+            )
+
+        translated = {}
+        if missing:
+            try:
+                translated = await DominanceEngine.atranslate_pack(packs[source_language], source_language, missing)
+            except (LimiterOverloaded, DeadlineExceeded):
+                raise
+            except Exception as e:
+                log.warning("⚠️ Translation Error", languages=missing, error=str(e))
+
+        for language in missing:
+            if language in translated:
+                packs[language] = translated[language]
+                await astore_pack(request, language, reference_dna, keys[language], translated[language])
+            else:
+                # الترجمة فشلت لهذه اللغة: توليد كامل كالمعتاد
+                packs[language] = await generation_flight.do(
+                    keys[language],
+                    lambda language=language: DominanceEngine.agenerate_pack(request, language, reference_dna, keys[language]),
+                )
+        return {language: packs[language] for language in languages}
+
+    @staticmethod
+    async def acomplete_pack(text: str, request: DominanceRequest, language: str, reference_dna: str, real_hashtags) -> dict:
+        """
+        الرد المقطوع أو المعطوب لا يعني إعادة التوليد: نصلح ما يمكن إصلاحه، ونحتفظ بكل
+        ما اكتمل، ونطلب الأقسام الناقصة فقط في استدعاءات صغيرة متوازية.
+        """
+        with span("parse"):
+            data = salvage_json(text)
+        if not isinstance(data, dict):
+            raise ValueError("Model output is not a JSON object")
+
+        missing = missing_sections(data)
+        if missing and stage_timeout(settings.GENERATION_TIMEOUT) < settings.DEADLINE_MIN_REPAIR:
+            # لا وقت لاستدعاءات الإصلاح: نعيد ما اكتمل فقط
+            degrade("section_repair_skipped")
+            missing = []
+        if missing:
+            log.warning("🩹 Salvaged partial payload", missing=missing)
+            fragments = await asyncio.gather(
+                *(DominanceEngine.agenerate_section(section, request, language, reference_dna, data) for section in missing),
+                return_exceptions=True,
+            )
+            for section, fragment in zip(missing, fragments):
+                if isinstance(fragment, LimiterOverloaded):
+                    raise fragment
+                if isinstance(fragment, Exception):
+                    log.warning("⚠️ Section Repair Error", section=section, error=str(fragment))
+                    degrade(f"{section}_missing")
+                    continue
+                data[section] = fragment
+
+        return normalize_response(data, real_hashtags)
+
+    @staticmethod
+    async def agenerate_section(section: str, request: DominanceRequest, language: str, reference_dna: str, partial: dict):
+        fields = pick(partial, TOP_LEVEL_ALIASES)
+        context = "\n".join(
+            f"- {h.get('text', '')}" for h in fields.get("hooks", []) if isinstance(h, dict)
+        ) or "Nothing yet."
+        prompt = generate_section_prompt(
+            section,
+            topic=request.topic_or_keyword,
+            tone=request.tone.value,
+            niche=request.dna.niche,
+            audience=request.dna.target_audience,
+            language=language,
+            reference_dna=reference_dna,
+            context=context,
+        )
+        model, safety = build_generation_model()
+        with span("section", section=section):
+            response = await wait_stage(
+                DominanceEngine.agenerate_with_retry(model, prompt, safety, call="section"), settings.GENERATION_TIMEOUT
+            )
+        fragment = salvage_json(response.text)
+        section_fields = pick(fragment, TOP_LEVEL_ALIASES) if isinstance(fragment, dict) else {}
+        canonical = {"score_data": "score", "hooks": "hooks", "script": "script"}[section]
+        value = section_fields.get(canonical)
+        if not value:
+            raise ValueError(f"Follow-up did not return {section}")
+        return value
+
+    @staticmethod
+    def stream(request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False, refresh: bool = False, deadline: Deadline = None):
+        return iterate_sync(DominanceEngine.astream(request, language=language, video_url=video_url, radar_mode=radar_mode, refresh=refresh, deadline=deadline))
+
+    @staticmethod
+    async def astream(request: DominanceRequest, language: str = "English", video_url: str = None, radar_mode: bool = False, refresh: bool = False, deadline: Deadline = None):
+        """
+        توليد بالبث: يرسل {"event": "score"|"hook"|"scene", "data": ...} فور اكتمال كل جزء،
+        ثم {"event": "pack"} بالحزمة الكاملة الموحدة (وتُحفظ في الكاش).
+        الميزانية تحكم المراحل السابقة للتوليد وفتح البث.
+        """
+        set_deadline(deadline or default_deadline(slow=bool(video_url or radar_mode)))
+        if not video_url:
+            request_history.record(request, language, radar_mode)
+        hashtags_task = prefetch_hashtags(request.dna.niche)
+        try:
+            reference_dna = await DominanceEngine.resolve_reference_dna(request, video_url, radar_mode)
+
+            cache_key = generation_cache_key(request, language, reference_dna)
+            if not refresh:
+                cached = await generation_cache.aget(cache_key)
+                if cached is not None:
+                    for event in pack_events(cached):
+                        yield event
+                    return
+
+                # البث يعيد حزمة نفس الكلمات فقط؛ التعديل (مسودة) ليس أسرع من البث نفسه
+                similar = await afind_similar(request, language, reference_dna)
+                if similar is not None and is_same_topic(request.topic_or_keyword, similar[1]):
+                    pack = await DominanceEngine.areuse_similar(request, language, reference_dna, cache_key, *similar)
+                    for event in pack_events(pack):
+                        yield event
+                    return
+
+            user_prompt = generate_user_prompt(
+                topic=request.topic_or_keyword,
+                tone=request.tone.value,
+                niche=request.dna.niche,
+                audience=request.dna.target_audience,
+                language=language,
+                reference_dna=reference_dna
+            )
+
+            log.info("🚀 Streaming", model=MODEL_NAME)
+            model, safety = build_generation_model()
+            with span("generation", mode="stream"):
+                response = await DominanceEngine.astart_stream(model, user_prompt, safety)
+
+                parser = IncrementalJSONParser()
+                chunks = []
+                async for chunk in response:
+                    chunks.append(chunk.text)
+                    for kind, obj in parser.feed(chunk.text):
+                        yield {"event": kind, "data": PIECE_NORMALIZERS[kind](obj)}
+            record_usage(response, MODEL_NAME, call="stream")
+
+            real_hashtags = await await_hashtags(request.dna.niche)
+            final_data = await DominanceEngine.acomplete_pack("".join(chunks), request, language, reference_dna, real_hashtags)
+            await astore_pack(request, language, reference_dna, cache_key, final_data)
+            yield {"event": "pack", "data": final_data}
+        finally:
+            hashtags_task.cancel()
+
+    @staticmethod
+    async def agenerate_packed(chunk: list, language: str = "English") -> dict:
+        """
+        توليد عدة طلبات (بدون استنساخ) في استدعاء واحد. يعيد {مفتاح الكاش: الحزمة}
+        والعناصر الناقصة من الرد تُترك للمستدعي ليعيد توليدها منفردة.
+        """
+        niches = {req.dna.niche for _, req in chunk}
+        hashtags_task = asyncio.gather(*(prefetch_hashtags(n) for n in niches))
+        try:
+            prompt = generate_batch_prompt([
+                {"topic": req.topic_or_keyword, "niche": req.dna.niche,
+                 "audience": req.dna.target_audience, "tone": req.tone.value}
+                for _, req in chunk
+            ], language)
+            # بدون تعليمات النظام: مخطط الحزمة الواحدة يتعارض مع رد {"items": [...]}
+            model, safety = get_model(MODEL_NAME, JSON_CONFIG), get_safety_settings()
+            with span("generation", mode="packed"):
+                response = await wait_stage(
+                    DominanceEngine.agenerate_with_retry(model, prompt, safety, call="packed"), settings.GENERATION_TIMEOUT
+                )
+            hashtags_by_niche = dict(zip(niches, await asyncio.gather(*(await_hashtags(n) for n in niches))))
+        finally:
+            hashtags_task.cancel()
+
+        data = salvage_json(response.text)
+        items = pick(data, {"items": ("items", 0)}).get("items", []) if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {}
+        by_id = {}
+        for item in items:
+            if isinstance(item, dict):
+                by_id.setdefault(pick(item, {"id": ("id", 0)}).get("id"), item)
+
+        packs = {}
+        for position, (key, req) in enumerate(chunk):
+            item = by_id.get(position)
+            if item is None and len(items) == len(chunk) and isinstance(items[position], dict):
+                item = items[position]
+            if not item:
+                continue
+            pack = normalize_response(item, hashtags_by_niche.get(req.dna.niche, []))
+            if not (pack["hooks"] or pack["script"]):
+                continue
+            packs[key] = pack
+            await astore_pack(req, language, None, key, pack)
+        return packs
+
+    @staticmethod
+    async def aprocess_batch(requests: list, language: str = "English", refresh: bool = False, pack_size: int = 1) -> list:
+        """
+        توليد جماعي: دمج المكرر، وتنفيذ الباقي بحد أقصى من التوازي،
+        وإرجاع نتيجة أو خطأ لكل عنصر بنفس الترتيب الأصلي.
+        """
+        keys = [generation_cache_key(req, language) for req in requests]
+        unique = {}
+        for key, req in zip(keys, requests):
+            unique.setdefault(key, req)
+
+        outcomes = {}
+        semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        pending = list(unique.items())
+
+        if pack_size > 1:
+            if not refresh:
+                for key, _ in pending:
+                    cached = await generation_cache.aget(key)
+                    if cached is not None:
+                        outcomes[key] = {"ok": True, "result": cached}
+                pending = [(k, r) for k, r in pending if k not in outcomes]
+
+            async def run_packed(chunk):
+                async with semaphore:
+                    try:
+                        packs = await DominanceEngine.agenerate_packed(chunk, language)
+                    except Exception as e:
+                        log.warning("⚠️ Packed Batch Error", error=str(e))
+                        return
+                for key, pack in packs.items():
+                    outcomes[key] = {"ok": True, "result": pack}
+
+            size = min(pack_size, settings.BATCH_MAX_PACK_SIZE)
+            await asyncio.gather(*(run_packed(pending[i:i + size]) for i in range(0, len(pending), size)))
+            pending = [(k, r) for k, r in pending if k not in outcomes]
+
+        async def run_single(key, req):
+            async with semaphore:
+                try:
+                    result = await DominanceEngine.aprocess(req, language=language, refresh=refresh)
+                    outcomes[key] = {"ok": True, "result": result}
+                except Exception as e:
+                    outcomes[key] = {"ok": False, "error": str(e)}
+
+        await asyncio.gather(*(run_single(k, r) for k, r in pending))
+        return [{"index": i, **outcomes[key]} for i, key in enumerate(keys)]
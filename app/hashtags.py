@@ -0,0 +1,97 @@
+import os
+import asyncio
+import httpx
+from app.config import get_settings
+from app.cache import TieredCache, normalize_text
+from app.telemetry import get_logger
+
+settings = get_settings()
+log = get_logger("hashtags")
+
+HASHTAG_URL = "https://rocketapi-for-tiktok.p.rapidapi.com/hashtags/search"
+HASHTAG_HOST = "rocketapi-for-tiktok.p.rapidapi.com"
+
+class HashtagProvider:
+    """
+    مزود الهاشتاجات: اتصال دائم (keep-alive) + كاش لكل كلمة مع تحديث في الخلفية
+    (stale-while-revalidate) وتخزين سلبي قصير عند الأخطاء.
+    """
+
+    def __init__(self):
+        self.cache = TieredCache(
+            "hashtags",
+            ttl=settings.HASHTAG_CACHE_TTL,
+            stale_ttl=settings.HASHTAG_STALE_TTL,
+            memory_size=1024,
+            disk_size=10000,
+        )
+        self._client = None
+        self._client_loop = None
+        self._inflight = {}
+        # يمكن حقن transport بديل (مثل httpx.MockTransport) للقياس بدون شبكة
+        self.transport = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # العميل مربوط بالـ event loop الذي أنشئ فيه
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=settings.HASHTAG_HTTP_TIMEOUT,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=self.transport,
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def get(self, keyword: str) -> list:
+        if not os.getenv("RAPID_API_KEY"):
+            return []
+        key = normalize_text(keyword)
+        entry = await self.cache.aget_entry(key)
+        await self.cache.arecord(entry, key)
+        if entry is not None:
+            if not entry.fresh:
+                self._refresh(key, keyword)
+            return entry.value
+        # المهمة مستقلة عن الطلب: لو انتهت مهلة المستدعي يكتمل الجلب ويُحفظ للمرة القادمة
+        return await asyncio.shield(self._refresh(key, keyword))
+
+    async def refresh(self, keyword: str) -> list:
+        """
+        جلب جديد بغض النظر عن الكاش (التسخين المسبق قبل الذروة).
+        """
+        if not os.getenv("RAPID_API_KEY"):
+            return []
+        return await self._refresh(normalize_text(keyword), keyword)
+
+    def _refresh(self, key: str, keyword: str) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, keyword))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch(self, key: str, keyword: str) -> list:
+        headers = {"X-RapidAPI-Key": os.getenv("RAPID_API_KEY", ""), "X-RapidAPI-Host": HASHTAG_HOST}
+        try:
+            response = await self._get_client().get(HASHTAG_URL, headers=headers, params={"keyword": keyword})
+            response.raise_for_status()
+            data = response.json()
+            tags = [f"#{tag['name']}" for tag in data.get("hashtags", [])[:10]]
+        except Exception as e:
+            log.warning("⚠️ Hashtag Error", keyword=keyword, error=str(e))
+            # نحتفظ بآخر نتيجة جيدة إن وجدت، ونؤجل المحاولة التالية
+            previous = await self.cache.aget_entry(key)
+            fallback = previous.value if previous is not None else []
+            await self.cache.aset(key, fallback, ttl=settings.HASHTAG_NEGATIVE_TTL)
+            return fallback
+        await self.cache.aset(key, tags)
+        return tags
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+hashtag_provider = HashtagProvider()
@@ -0,0 +1,95 @@
+import time
+import asyncio
+from collections import deque
+from app.config import get_settings
+from app.telemetry import get_logger, HEDGE_CALLS, HEDGES, HEDGE_WINS
+
+settings = get_settings()
+log = get_logger("hedging")
+
+class Hedger:
+    """
+    طلبات احتياطية (hedged requests) لذيل زمن الاستجابة: إذا لم يعد الاستدعاء الأساسي
+    خلال نسبة مئوية من الأزمنة الأخيرة (p95 افتراضياً) نرسل استدعاءً ثانياً، وأول نتيجة صالحة تفوز
+    والأخرى تُلغى. نسبة الاستدعاءات المكررة محدودة بـ HEDGE_MAX_RATE.
+    """
+
+    def __init__(self, name: str, window: int = 500):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.wins = {"primary": 0, "hedge": 0}
+
+    def delay(self) -> float:
+        if len(self.latencies) < settings.HEDGE_MIN_SAMPLES:
+            return settings.HEDGE_DEFAULT_DELAY
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * settings.HEDGE_PERCENTILE / 100))
+        return max(settings.HEDGE_MIN_DELAY, ordered[index])
+
+    def _allowed(self, has_capacity) -> bool:
+        return self.hedged < settings.HEDGE_MAX_RATE * self.calls and has_capacity()
+
+    async def run(self, primary, hedge, is_valid, has_capacity=lambda: True):
+        """
+        primary و hedge دوال تُنشئ coroutine. النتيجة غير الصالحة لا تفوز لكنها تُعاد
+        إذا لم ينجح غيرها (والمستدعي يصلحها)، والخطأ يُرفع فقط إذا فشل الجميع.
+        """
+        self.calls += 1
+        HEDGE_CALLS.labels(hedger=self.name).inc()
+        start = time.monotonic()
+        delay = self.delay()
+        tasks = {asyncio.ensure_future(primary()): "primary"}
+        hedge_due, raced = True, False
+        fallback, error = None, None
+        try:
+            while tasks:
+                timeout = max(0.0, delay - (time.monotonic() - start)) if hedge_due else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_due = False
+                    if self._allowed(has_capacity):
+                        self.hedged += 1
+                        raced = True
+                        HEDGES.labels(hedger=self.name).inc()
+                        log.info("🪁 Hedging", hedger=self.name, after_s=round(delay, 2))
+                        tasks[asyncio.ensure_future(hedge())] = "hedge"
+                    continue
+
+                for task in done:
+                    label = tasks.pop(task)
+                    if label == "primary":
+                        self.latencies.append(time.monotonic() - start)
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    result = task.result()
+                    if is_valid(result):
+                        if "primary" in tasks.values():
+                            # الأساسي خسر: زمنه على الأقل ما مضى حتى الآن
+                            self.latencies.append(time.monotonic() - start)
+                        if raced:
+                            self.wins[label] += 1
+                            HEDGE_WINS.labels(hedger=self.name, winner=label).inc()
+                        return result
+                    if fallback is None:
+                        fallback = result
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "wins": dict(self.wins),
+            "delay_s": self.delay(),
+        }
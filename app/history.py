@@ -0,0 +1,122 @@
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from app.config import get_settings
+from app.cache import make_key
+from app.schemas import DominanceRequest
+from app.telemetry import get_logger
+
+settings = get_settings()
+log = get_logger("history")
+
+class RequestHistory:
+    """
+    عدد مرات كل طلب (موضوع + نيش + نبرة + لغة + رادار) وآخر ظهور له، مشترك بين العمال عبر SQLite.
+    مصدر التسخين المسبق (app.prewarm) عند غياب قائمة مواضيع مضبوطة.
+    التسجيل في الذاكرة فقط، والكتابة دفعة واحدة كل HISTORY_FLUSH_INTERVAL من مهمة خلفية (خارج حلقة الأحداث).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+        # {المفتاح: [payload, hits, first_seen, last_seen]} بانتظار الكتابة
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flusher = None
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " key TEXT PRIMARY KEY, payload TEXT NOT NULL, hits INTEGER NOT NULL,"
+                " first_seen REAL NOT NULL, last_seen REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS history_recent ON history (last_seen)")
+            self._conn = conn
+        return self._conn
+
+    def record(self, request: DominanceRequest, language: str, radar_mode: bool = False):
+        # السجل لا يوقف الطلب أبداً: لا SQLite هنا
+        key = make_key(
+            request.topic_or_keyword, request.tone.value, request.dna.niche,
+            request.dna.target_audience, language, radar_mode,
+        )
+        now = time.time()
+        with self._pending_lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                payload = json.dumps(
+                    {"request": request.model_dump(mode="json"), "language": language, "radar_mode": radar_mode},
+                    ensure_ascii=False,
+                )
+                self._pending[key] = [payload, 1, now, now]
+            else:
+                entry[1] += 1
+                entry[3] = now
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_forever())
+        except RuntimeError:
+            # استدعاء متزامن بدون حلقة: كتابة مباشرة
+            self.flush()
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(settings.HISTORY_FLUSH_INTERVAL)
+            await asyncio.to_thread(self.flush)
+
+    def flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(
+                        "INSERT INTO history (key, payload, hits, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT(key) DO UPDATE SET hits = hits + excluded.hits,"
+                        " last_seen = MAX(last_seen, excluded.last_seen)",
+                        [(key, *entry) for key, entry in pending.items()],
+                    )
+                finally:
+                    conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            log.warning("⚠️ History Error", error=str(e), dropped=len(pending))
+
+    async def stop(self):
+        # عند الإغلاق: لا نفقد آخر دفعة
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await asyncio.to_thread(self.flush)
+
+    def top(self, limit: int, window: float) -> list:
+        """
+        أكثر الطلبات تكراراً بين التي ظهرت خلال window ثانية: [{"request", "language", "radar_mode", "hits"}].
+        """
+        self.flush()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM history WHERE last_seen < ?", (now - settings.HISTORY_RETENTION,))
+            rows = conn.execute(
+                "SELECT payload, hits FROM history WHERE last_seen >= ? ORDER BY hits DESC, last_seen DESC LIMIT ?",
+                (now - window, limit),
+            ).fetchall()
+        return [{**json.loads(payload), "hits": hits} for payload, hits in rows]
+
+request_history = RequestHistory(settings.HISTORY_DB_PATH)
@@ -0,0 +1,246 @@
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from app.config import get_settings
+from app.schemas import DominanceRequest
+from app.engine import DominanceEngine
+from app.deadline import Deadline
+from app.telemetry import get_logger, new_trace_id, trace_id_var
+
+settings = get_settings()
+log = get_logger("jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+class JobStore:
+    """
+    حالة المهام في SQLite: تبقى بعد إعادة التشغيل، وكل العمال يسحبون من نفس الطابور.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL,"
+                " result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL, heartbeat_at REAL)"
+            )
+            # قواعد أنشئت قبل عمود النبض
+            if "heartbeat_at" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def create(self, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def claim(self):
+        """
+        حجز أقدم مهمة منتظرة بشكل ذري (عامل واحد فقط يحصل عليها).
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, heartbeat_at = ? WHERE id = ?",
+                    (RUNNING, now, now, row["id"]),
+                )
+                return dict(row)
+            finally:
+                conn.execute("COMMIT")
+
+    def heartbeat(self, job_id: str):
+        # العامل الذي ينفذ المهمة ما زال حياً
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?", (time.time(), job_id, RUNNING)
+            )
+
+    def finish(self, job_id: str, result: dict = None, error: str = None):
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (
+                    FAILED if error is not None else DONE,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error, time.time(), job_id,
+                ),
+            )
+
+    def requeue(self, job_id: str):
+        # إيقاف العامل (نشر جديد / إعادة تشغيل) ليس خطأ المهمة: تعود للطابور بدون استهلاك محاولة
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), heartbeat_at = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), job_id, RUNNING),
+            )
+
+    def recover(self) -> int:
+        """
+        مع كل دورة استطلاع: المهام في "running" التي توقف نبضها (عامل مات فجأة) تعود للطابور،
+        والمهام المنتهية القديمة تُحذف. الحد دائماً أطول من JOB_DEADLINE حتى لا تُعاد مهمة ما زالت تعمل.
+        يعيد عدد المهام التي عادت للطابور.
+        """
+        now = time.time()
+        stale_before = now - max(settings.JOB_STALE_AFTER, settings.JOB_DEADLINE + settings.JOB_HEARTBEAT_INTERVAL)
+        with self._lock:
+            conn = self._connection()
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?"
+                " AND COALESCE(heartbeat_at, updated_at) < ? AND attempts < ?",
+                (QUEUED, now, RUNNING, stale_before, settings.JOB_MAX_ATTEMPTS),
+            ).rowcount
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status = ?"
+                " AND COALESCE(heartbeat_at, updated_at) < ?",
+                (FAILED, "Worker lost while running job", now, RUNNING, stale_before),
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, now - settings.JOB_RETENTION),
+            )
+        return requeued
+
+class JobQueue:
+    """
+    مجمّع عمال محلي داخل العملية لتنفيذ المسار الطويل (سحب -> تحليل DNA -> توليد)
+    بعيداً عن مهلة طلب HTTP.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self._workers = []
+        self._wakeup = None
+
+    async def submit(self, request: DominanceRequest, language: str = "English", video_url: str = None,
+                     radar_mode: bool = False, refresh: bool = False) -> str:
+        # كل استدعاءات SQLite خارج حلقة الأحداث
+        job_id = await asyncio.to_thread(self.store.create, {
+            "request": request.model_dump(mode="json"),
+            "language": language,
+            "video_url": video_url,
+            "radar_mode": radar_mode,
+            "refresh": refresh,
+            "trace_id": trace_id_var.get(),
+        })
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str):
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(settings.JOB_WORKERS)]
+        self._workers.append(asyncio.create_task(self._recover_forever()))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _recover_forever(self):
+        # ليس عند الإقلاع فقط: عامل في عملية أخرى قد يموت في أي وقت
+        while True:
+            try:
+                if await asyncio.to_thread(self.store.recover):
+                    self._wakeup.set()
+            except sqlite3.Error as e:
+                log.warning("⚠️ Job Recovery Error", error=str(e))
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+
+    async def _claim(self):
+        claiming = asyncio.ensure_future(asyncio.to_thread(self.store.claim))
+        try:
+            return await asyncio.shield(claiming)
+        except asyncio.CancelledError:
+            # الإيقاف وصل أثناء الحجز: المهمة المحجوزة تعود للطابور بدل أن تبقى "running"
+            job = await claiming
+            if job is not None:
+                await asyncio.to_thread(self.store.requeue, job["id"])
+            raise
+
+    async def _worker(self):
+        while True:
+            job = await self._claim()
+            if job is None:
+                # ننتظر إشعاراً من submit في نفس العملية، أو نستطلع الطابور (مهام من عمال آخرين)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        payload = json.loads(job["payload"])
+        # رقم تتبع المهمة هو رقم الطلب الذي أنشأها إن وجد
+        new_trace_id(payload.get("trace_id"))
+        log.info("🧵 Job started", job_id=job["id"])
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await DominanceEngine.aprocess(
+                DominanceRequest(**payload["request"]),
+                language=payload["language"],
+                video_url=payload["video_url"],
+                radar_mode=payload["radar_mode"],
+                refresh=payload["refresh"],
+                deadline=Deadline(settings.JOB_DEADLINE),
+            )
+        except asyncio.CancelledError:
+            log.warning("↩️ Job requeued", job_id=job["id"])
+            await asyncio.to_thread(self.store.requeue, job["id"])
+            raise
+        except Exception as e:
+            log.error("❌ Job failed", job_id=job["id"], error=repr(e))
+            # repr وليس str: بعض الأخطاء رسالتها فارغة
+            await asyncio.to_thread(self.store.finish, job["id"], error=repr(e))
+            return
+        finally:
+            heartbeat.cancel()
+        await asyncio.to_thread(self.store.finish, job["id"], result=result)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, job_id)
+            except sqlite3.Error as e:
+                log.warning("⚠️ Job Heartbeat Error", job_id=job_id, error=str(e))
+
+job_queue = JobQueue(JobStore(settings.JOBS_DB_PATH))
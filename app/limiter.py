@@ -0,0 +1,258 @@
+import re
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from collections import deque
+from app.config import get_settings
+from app.tokens import count_tokens
+from app.deadline import stage_timeout
+from app.telemetry import span, LLM_RETRIES, LLM_SHED
+
+settings = get_settings()
+
+class LimiterOverloaded(Exception):
+    """
+    الطابور ممتلئ أو الانتظار المتوقع أطول من المسموح: نرفض فوراً (503) بدل التكديس.
+    """
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+RATE_LIMIT_NAMES = {"ResourceExhausted", "TooManyRequests"}
+TRANSIENT_NAMES = {"InternalServerError", "ServiceUnavailable", "DeadlineExceeded", "GatewayTimeout"}
+RETRY_DELAY_PATTERNS = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+    re.compile(r"retry-after:?\s*(\d+(?:\.\d+)?)", re.IGNORECASE),
+]
+
+def is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "code", None) == 429 or type(error).__name__ in RATE_LIMIT_NAMES or "429" in str(error)
+
+def is_transient(error: Exception) -> bool:
+    return getattr(error, "code", None) in (500, 503, 504) or type(error).__name__ in TRANSIENT_NAMES
+
+def retry_after_of(error: Exception) -> float:
+    text = str(error)
+    for pattern in RETRY_DELAY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1))
+    return settings.LLM_THROTTLE_COOLDOWN
+
+def estimate_tokens(text: str) -> int:
+    # توكنز المدخلات (تقدير) + المخرجات المتوقعة
+    return count_tokens(text) + settings.LLM_EXPECTED_OUTPUT_TOKENS
+
+class SharedQuotaStore:
+    """
+    حالة الحصة المشتركة بين كل عمال uvicorn (SQLite محلي):
+    دلاء التوكن (طلبات/دقيقة وتوكنات/دقيقة) + فترة التهدئة بعد 429.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS limiter (name TEXT PRIMARY KEY, value REAL NOT NULL, updated_at REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def take(self, buckets: list):
+        """
+        buckets: [(الاسم, الكمية, السعة, معدل الامتلاء بالثانية)]
+        يعيد (ثواني الانتظار المطلوبة أو 0 عند النجاح, رقم آخر حدث 429).
+        الخصم يحدث فقط إذا توفرت كل الدلاء معاً.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = {name: (value, updated) for name, value, updated in conn.execute("SELECT name, value, updated_at FROM limiter")}
+                epoch = state.get("throttle_epoch", (0, now))[0]
+                cooldown_until = state.get("cooldown_until", (0, now))[0]
+                if now < cooldown_until:
+                    return cooldown_until - now, epoch
+
+                levels, wait = {}, 0.0
+                for name, amount, capacity, rate in buckets:
+                    tokens, updated = state.get(name, (capacity, now))
+                    level = min(capacity, tokens + (now - updated) * rate)
+                    levels[name] = level
+                    if level < amount:
+                        wait = max(wait, (min(amount, capacity) - level) / rate)
+
+                for name, amount, capacity, rate in buckets:
+                    level = levels[name] if wait else levels[name] - amount
+                    conn.execute("INSERT OR REPLACE INTO limiter VALUES (?, ?, ?)", (name, level, now))
+                return wait, epoch
+            finally:
+                conn.execute("COMMIT")
+
+    def throttle(self, seconds: float) -> float:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value FROM limiter WHERE name = 'cooldown_until'").fetchone()
+                until = max(row[0] if row else 0, now + seconds)
+                conn.execute("INSERT OR REPLACE INTO limiter VALUES ('cooldown_until', ?, ?)", (until, now))
+                row = conn.execute("SELECT value FROM limiter WHERE name = 'throttle_epoch'").fetchone()
+                epoch = (row[0] if row else 0) + 1
+                conn.execute("INSERT OR REPLACE INTO limiter VALUES ('throttle_epoch', ?, ?)", (epoch, now))
+                return epoch
+            finally:
+                conn.execute("COMMIT")
+
+class AdaptiveLimiter:
+    """
+    بوابة واحدة أمام كل استدعاءات النموذج:
+    - دلو توكن مشترك بين العمليات (RPM + TPM) مع احترام Retry-After.
+    - توازي متكيّف AIMD: +1 تدريجياً مع النجاح، والنصف عند 429 في أي عملية.
+    - رفض سريع عند امتلاء الطابور.
+    """
+
+    def __init__(self, store: SharedQuotaStore):
+        self.store = store
+        self.limit = float(settings.LLM_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.waiting = 0
+        self.seen_epoch = 0
+        self.throttled = 0
+        self.shed = 0
+        self._waiters = deque()
+        # (الاسم، النسبة): عملية تستهلك جزءاً فقط من الحصة المشتركة (التسخين المسبق)
+        self.share = None
+
+    def limit_share(self, name: str, share: float):
+        """
+        حصر استدعاءات هذه العملية في نسبة من RPM/TPM: دلاء خاصة بالاسم (مشتركة بين
+        عمليات نفس الاسم) تُخصم معاً مع الدلاء العامة.
+        """
+        self.share = (name, share) if share < 1 else None
+
+    def _buckets(self, tokens: int):
+        buckets = [
+            ("rpm", 1, settings.LLM_RPM, settings.LLM_RPM / 60),
+            ("tpm", tokens, settings.LLM_TPM, settings.LLM_TPM / 60),
+        ]
+        if self.share is not None:
+            name, share = self.share
+            rpm, tpm = settings.LLM_RPM * share, settings.LLM_TPM * share
+            buckets += [(f"{name}_rpm", 1, max(1.0, rpm), rpm / 60), (f"{name}_tpm", tokens, tpm, tpm / 60)]
+        return buckets
+
+    def _decrease(self):
+        self.limit = max(float(settings.LLM_MIN_CONCURRENCY), self.limit / 2)
+
+    async def acquire(self, tokens: int):
+        if self.waiting >= settings.LLM_MAX_QUEUE:
+            self.shed += 1
+            LLM_SHED.inc()
+            raise LimiterOverloaded("LLM queue is full", retry_after=settings.LLM_THROTTLE_COOLDOWN)
+        self.waiting += 1
+        try:
+            while self.in_flight >= int(self.limit):
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    # لو أُيقظنا ثم أُلغينا، نمرر الدور للتالي
+                    if waiter.done() and not waiter.cancelled():
+                        self._wake_next()
+                    raise
+
+            # نحجز المقعد قبل انتظار الحصة حتى لا يتجاوز عدد المنفذين الحد
+            self.in_flight += 1
+            started = time.monotonic()
+            # لا ننتظر الحصة أطول مما تبقى من ميزانية الطلب
+            max_wait = stage_timeout(settings.LLM_MAX_WAIT)
+            try:
+                while True:
+                    # SQLite (BEGIN IMMEDIATE قد ينتظر عمالاً آخرين) خارج حلقة الأحداث
+                    wait, epoch = await asyncio.to_thread(self.store.take, self._buckets(tokens))
+                    if epoch > self.seen_epoch:
+                        # عملية أخرى تلقت 429: نخفض التوازي هنا أيضاً
+                        self.seen_epoch = epoch
+                        self._decrease()
+                    if wait <= 0:
+                        break
+                    if time.monotonic() - started + wait > max_wait:
+                        self.shed += 1
+                        LLM_SHED.inc()
+                        raise LimiterOverloaded("LLM quota exhausted", retry_after=wait)
+                    await asyncio.sleep(min(wait, 1.0))
+            except BaseException:
+                self.in_flight -= 1
+                self._wake_next()
+                raise
+        finally:
+            self.waiting -= 1
+
+    async def release(self, succeeded: bool = False, throttled: bool = False, retry_after: float = 0):
+        self.in_flight -= 1
+        try:
+            if throttled:
+                self.throttled += 1
+                self._decrease()
+                epoch = await asyncio.to_thread(self.store.throttle, retry_after)
+                self.seen_epoch = max(self.seen_epoch, epoch)
+            elif succeeded:
+                # الزيادة فقط مع نجاح فعلي: خطأ خادم مؤقت لا يعني أن التوازي الحالي مناسب
+                self.limit = min(float(settings.LLM_MAX_CONCURRENCY), self.limit + 1 / self.limit)
+        finally:
+            self._wake_next()
+
+    def _wake_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                break
+
+    async def run(self, call, tokens: int):
+        """
+        تنفيذ استدعاء للنموذج عبر البوابة. 429 يعيد المحاولة بعد فترة التهدئة المشتركة،
+        وأخطاء الخادم المؤقتة بانتظار متصاعد، وأي خطأ آخر يُرفع مباشرة.
+        """
+        for attempt in range(1, settings.LLM_MAX_ATTEMPTS + 1):
+            last = attempt == settings.LLM_MAX_ATTEMPTS
+            with span("llm_wait"):
+                await self.acquire(tokens)
+            outcome = {}
+            try:
+                result = await call()
+                outcome = {"succeeded": True}
+                return result
+            except Exception as e:
+                if is_rate_limited(e):
+                    outcome = {"throttled": True, "retry_after": retry_after_of(e)}
+                    if last:
+                        raise
+                elif last or not is_transient(e):
+                    raise
+                failure = e
+            finally:
+                await self.release(**outcome)
+            backoff = 0 if outcome else min(10, 2 ** attempt) + random.random()
+            if stage_timeout(backoff) < backoff:
+                # لا وقت لمحاولة أخرى ضمن ميزانية الطلب
+                raise failure
+            LLM_RETRIES.labels(reason="rate_limited" if outcome else "transient").inc()
+            if backoff:
+                await asyncio.sleep(backoff)
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+llm_limiter = AdaptiveLimiter(SharedQuotaStore(settings.LIMITER_DB_PATH))
@@ -1,11 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends
+import json
+import time
+from typing import Optional, List
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Query
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings, Settings
-from app.schemas import DominanceRequest, AlphaPack
+from app.schemas import (
+    DominanceRequest, AlphaPack, DominanceBatchRequest, DominanceBatchResponse, JobRequest, JobStatus, MultiLanguageResponse
+)
 from app.engine import DominanceEngine
+from app.hashtags import hashtag_provider
+from app.history import request_history
+from app.limiter import LimiterOverloaded
+from app.deadline import Deadline, DeadlineExceeded
+from app.jobs import job_queue, DONE, FAILED
+from app.telemetry import get_logger, new_trace_id, metrics_payload, REQUEST_LATENCY
 
 # تهيئة الإعدادات
 settings = get_settings()
+log = get_logger("api")
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -22,6 +35,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# رقم تتبع لكل طلب (يُقبل من X-Request-ID) + زمن الطلب حسب المسار وليس الرابط الفعلي
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    trace_id = new_trace_id(request.headers.get("x-request-id"))
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = trace_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        path = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_LATENCY.labels(path=path, status=str(status)).observe(elapsed)
+        log.info("request", method=request.method, path=path, status=status, ms=round(elapsed * 1000, 1))
+
+@app.on_event("startup")
+async def start_workers():
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def close_pools():
+    await job_queue.stop()
+    await request_history.stop()
+    await hashtag_provider.aclose()
+
+# الحصة مستنفدة أو الطابور ممتلئ: رفض سريع بدل تكديس الطلبات
+@app.exception_handler(LimiterOverloaded)
+async def limiter_overloaded(request, exc: LimiterOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Engine Busy: {str(exc)}"},
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
+
+# الميزانية انتهت قبل اكتمال التوليد
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": f"Deadline Exceeded: {str(exc)}"})
+
 # --- Endpoints ---
 
 @app.get("/")
@@ -36,19 +90,129 @@ async def root():
         "version": settings.VERSION
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    مقاييس Prometheus: زمن كل مرحلة، إعادة المحاولات، التوكنز، ونسب إصابة الكاش.
+    """
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
 @app.post(f"{settings.API_PREFIX}/generate", response_model=AlphaPack)
-async def generate_dominance_pack(request: DominanceRequest):
+async def generate_dominance_pack(
+    request: DominanceRequest, refresh: bool = False, language: str = "English",
+    deadline: Optional[float] = Query(None, gt=0, le=settings.MAX_REQUEST_DEADLINE),
+):
     """
     Heart of the System: يستقبل الـ DNA والنيش، ويعيد حزمة محتوى كاملة.
+    refresh=true يتجاوز الكاش ويفرض توليداً جديداً.
+    deadline=ثوانٍ: ميزانية الطلب (الافتراضي REQUEST_DEADLINE)، وما تم تجاوزه يظهر في degradations.
     """
+    budget = Deadline(deadline or settings.REQUEST_DEADLINE)
     try:
         # استدعاء المحرك لتنفيذ العمليات
-        result = DominanceEngine.process(request)
-        return result
+        result = await DominanceEngine.aprocess(request, language=language, refresh=refresh, deadline=budget)
+        return {**result, "degradations": budget.degradations}
+    except (LimiterOverloaded, DeadlineExceeded):
+        raise
     except Exception as e:
         # في حالة الخطأ، لا ننهار، بل نعيد رسالة خطأ منظمة
         raise HTTPException(status_code=500, detail=f"Core Engine Failure: {str(e)}")
 
+@app.post(f"{settings.API_PREFIX}/generate/stream")
+async def generate_dominance_stream(request: DominanceRequest, refresh: bool = False, format: str = "ndjson", language: str = "English"):
+    """
+    نفس /generate لكن بالبث: كل خطاف ومشهد والسكور يُرسل فور اكتماله.
+    format=ndjson (افتراضي) أو format=sse.
+    """
+    sse = format == "sse"
+
+    def encode(event: dict) -> str:
+        if sse:
+            return f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+        return json.dumps(event, ensure_ascii=False) + "\n"
+
+    async def body():
+        try:
+            async for event in DominanceEngine.astream(request, language=language, refresh=refresh):
+                yield encode(event)
+        except Exception as e:
+            yield encode({"event": "error", "data": {"detail": f"Core Engine Failure: {str(e)}"}})
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+@app.post(f"{settings.API_PREFIX}/generate/languages", response_model=MultiLanguageResponse)
+async def generate_languages(
+    request: DominanceRequest, languages: List[str] = Query(..., min_length=1), refresh: bool = False,
+    deadline: Optional[float] = Query(None, gt=0, le=settings.MAX_REQUEST_DEADLINE),
+):
+    """
+    نفس الحزمة بعدة لغات (?languages=English&languages=Arabic): توليد واحد + استدعاء ترجمة واحد.
+    """
+    if len(languages) > settings.MAX_LANGUAGES_PER_REQUEST:
+        raise HTTPException(status_code=413, detail=f"Too many languages (max {settings.MAX_LANGUAGES_PER_REQUEST})")
+    budget = Deadline(deadline or settings.REQUEST_DEADLINE)
+    try:
+        packs = await DominanceEngine.aprocess_languages(request, languages, refresh=refresh, deadline=budget)
+        return {"packs": packs, "degradations": budget.degradations}
+    except (LimiterOverloaded, DeadlineExceeded):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Core Engine Failure: {str(e)}")
+
+@app.post(f"{settings.API_PREFIX}/generate/batch", response_model=DominanceBatchResponse)
+async def generate_batch(batch: DominanceBatchRequest):
+    """
+    توليد جماعي: نتيجة أو خطأ لكل عنصر بنفس ترتيب الإدخال.
+    """
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {settings.BATCH_MAX_ITEMS} items)")
+    results = await DominanceEngine.aprocess_batch(
+        batch.items, language=batch.language, refresh=batch.refresh, pack_size=batch.pack_size
+    )
+    return {"results": results}
+
+# --- Jobs (الاستنساخ والرادار في الخلفية) ---
+
+def job_status(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "error": job["error"],
+    }
+
+@app.post(f"{settings.API_PREFIX}/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(job: JobRequest):
+    """
+    يعيد رقم المهمة فوراً؛ التنفيذ يتم في مجمّع العمال الخلفي.
+    """
+    job_id = await job_queue.submit(
+        job.request, language=job.language, video_url=job.video_url,
+        radar_mode=job.radar_mode, refresh=job.refresh,
+    )
+    return job_status(await job_queue.get(job_id))
+
+@app.get(f"{settings.API_PREFIX}/jobs/{{job_id}}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+@app.get(f"{settings.API_PREFIX}/jobs/{{job_id}}/result")
+async def get_job_result(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=f"Core Engine Failure: {job['error']}")
+    if job["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return json.loads(job["result"])
+
 # لتشغيل السيرفر محلياً إذا تطلب الأمر
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,68 @@
+import json
+import threading
+from app.config import get_settings
+
+settings = get_settings()
+
+# النماذج المستخدمة في المحرك
+MODEL_NAME = "gemini-flash-latest"
+DNA_MODEL_NAME = "gemini-1.5-flash"
+JSON_CONFIG = {"response_mime_type": "application/json"}
+
+# SDK جوجل ثقيل: لا يُستورد ولا يُهيأ إلا عند أول استدعاء فعلي للنموذج
+_genai = None
+_registry = {}
+_safety_settings = None
+_lock = threading.Lock()
+
+def get_genai():
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=settings.GOOGLE_API_KEY)
+                _genai = genai
+    return _genai
+
+def _registry_key(model_name: str, generation_config: dict = None, system_instruction: str = None):
+    return model_name, json.dumps(generation_config or {}, sort_keys=True), system_instruction
+
+def get_model(model_name: str, generation_config: dict = None, system_instruction: str = None):
+    """
+    نموذج واحد لكل (اسم، إعدادات، تعليمات نظام) طوال عمر العملية بدل إنشائه مع كل طلب.
+    """
+    key = _registry_key(model_name, generation_config, system_instruction)
+    model = _registry.get(key)
+    if model is None:
+        genai = get_genai()
+        with _lock:
+            model = _registry.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name=model_name, generation_config=generation_config, system_instruction=system_instruction
+                )
+                _registry[key] = model
+    return model
+
+def register_model(model, model_name: str, generation_config: dict = None, system_instruction: str = None):
+    """
+    حقن نموذج جاهز في السجل (نماذج وهمية للقياس والتجارب).
+    """
+    _registry[_registry_key(model_name, generation_config, system_instruction)] = model
+
+def get_safety_settings():
+    global _safety_settings
+    if _safety_settings is None:
+        from google.generativeai.types import HarmCategory, HarmBlockThreshold
+        _safety_settings = {
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+        }
+    return _safety_settings
+
+def set_safety_settings(safety: dict):
+    global _safety_settings
+    _safety_settings = safety
@@ -0,0 +1,116 @@
+import json
+
+# orjson أسرع بكثير في فك JSON، وإن لم يكن مثبتاً نرجع للمكتبة القياسية
+try:
+    import orjson
+
+    def loads(text):
+        return orjson.loads(text)
+
+    JSON_BACKEND = "orjson"
+except ImportError:
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+# جداول البدائل: كل اسم يرسله النموذج -> (الحقل الموحد, الأولوية). الأولوية الأقل تفوز.
+TOP_LEVEL_ALIASES = {
+    "score_data": ("score", 0), "dominance_score": ("score", 1),
+    "hooks": ("hooks", 0),
+    "script": ("script", 0), "script_timeline": ("script", 1), "timeline": ("script", 2),
+    "hashtags": ("hashtags", 0),
+    "caption": ("caption", 0),
+    "flex": ("flex", 0), "viral_flex_text": ("flex", 1),
+}
+SCORE_ALIASES = {
+    "score": ("score", 0), "why": ("why", 0),
+    "fix": ("fix", 0), "minimum_fix": ("fix", 1),
+}
+SCENE_ALIASES = {
+    "time": ("time", 0), "time_start": ("time", 1),
+    "type": ("type", 0),
+    "text": ("text", 0), "script": ("text", 1),
+    "screen": ("screen", 0), "screen_text": ("screen", 1),
+    "visual": ("visual", 0), "visual_direction": ("visual", 1),
+}
+HOOK_ALIASES = {
+    "type": ("type", 0), "text": ("text", 0),
+    "visual": ("visual", 0), "visual_cue": ("visual", 1),
+}
+
+def pick(obj: dict, table: dict) -> dict:
+    """
+    مرور واحد على مفاتيح الكائن: نحوّل لحروف صغيرة المفاتيح فقط (وليس القيم)
+    ونأخذ البديل الأعلى أولوية لكل حقل.
+    """
+    found, ranks = {}, {}
+    for key, value in obj.items():
+        target = table.get(key)
+        if target is None:
+            target = table.get(key.lower())
+            if target is None:
+                continue
+        field, rank = target
+        if rank < ranks.get(field, 99):
+            found[field] = value
+            ranks[field] = rank
+    return found
+
+def strip_fences(text: str) -> str:
+    # كل ما قبل أول قوس وبعد آخر قوس (```json أو أي كلام زائد) يُحذف في خطوة واحدة
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    end = max(text.rfind("}"), text.rfind("]"))
+    if not starts or end < min(starts):
+        return text.strip()
+    return text[min(starts):end + 1]
+
+def decode(text: str):
+    return loads(strip_fences(text))
+
+def normalize_score(raw_score):
+    final_score = {"score": 85, "why": ["Analysis pending"], "fix": "Check manually"}
+
+    if isinstance(raw_score, dict):
+        fields = pick(raw_score, SCORE_ALIASES)
+        final_score["score"] = fields.get("score", 85)
+        final_score["why"] = fields.get("why", ["Good potential"])
+        final_score["fix"] = fields.get("fix", "Optimize hooks")
+    elif isinstance(raw_score, (int, float)):
+        final_score["score"] = int(raw_score)
+    return final_score
+
+def normalize_scene(s: dict) -> dict:
+    fields = pick(s, SCENE_ALIASES)
+    return {
+        "time": fields.get("time", "00:00"),
+        "type": fields.get("type", "Scene"),
+        "text": fields.get("text", "..."),
+        "screen": fields.get("screen", ""),
+        "visual": fields.get("visual", "..."),
+    }
+
+def normalize_hook(h: dict) -> dict:
+    fields = pick(h, HOOK_ALIASES)
+    return {
+        "type": fields.get("type", "Hook"),
+        "text": fields.get("text", "..."),
+        "visual": fields.get("visual", "..."),
+    }
+
+def normalize_response(data: dict, real_hashtags) -> dict:
+    """
+    مصفاة البيانات: تضمن تحويل أي هيكل يرسله الذكاء إلى الهيكل القياسي للواجهة.
+    """
+    fields = pick(data, TOP_LEVEL_ALIASES) if isinstance(data, dict) else {}
+
+    raw_script = fields.get("script", [])
+    raw_hooks = fields.get("hooks", [])
+    ai_hashtags = fields.get("hashtags", [])
+
+    return {
+        "score_data": normalize_score(fields.get("score", {})),
+        "hooks": [normalize_hook(h) for h in raw_hooks if isinstance(h, dict)] if isinstance(raw_hooks, list) else [],
+        "script": [normalize_scene(s) for s in raw_script if isinstance(s, dict)] if isinstance(raw_script, list) else [],
+        "hashtags": real_hashtags if real_hashtags else (ai_hashtags if isinstance(ai_hashtags, list) else []),
+        "caption": fields.get("caption", "Watch this!"),
+        "flex": fields.get("flex", "AI Dominator"),
+    }
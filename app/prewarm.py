@@ -0,0 +1,243 @@
+"""
+التسخين المسبق: عملية مستقلة بجانب app/main.py تملأ كاش الهاشتاجات وملفات الرادار وحزم التوليد
+في النوافذ الهادئة (PREWARM_WINDOWS) حتى تُخدم طلبات الذروة من الكاش.
+
+    python -m app.prewarm             # جدولة مستمرة داخل النوافذ
+    python -m app.prewarm --once      # دورة واحدة الآن (بدون انتظار النافذة)
+    python -m app.prewarm --report    # نسبة خدمة المداخل المُسخّنة
+
+المصادر: PREWARM_TARGETS_PATH (JSON) وأكثر الطلبات تكراراً في app.history. الاستدعاءات تمر بنفس
+بوابة النموذج لكن بدلاء خاصة لا تتجاوز PREWARM_QUOTA_SHARE من RPM/TPM.
+
+شكل ملف الأهداف:
+    {"niches": ["Fitness"], "radar_niches": ["Digital Marketing"],
+     "requests": [{"request": {...DominanceRequest}, "languages": ["Arabic", "English"], "radar_mode": false}]}
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+from app.config import get_settings
+from app.cache import TieredCache, get_connection, normalize_text
+from app.schemas import DominanceRequest
+from app.limiter import llm_limiter, LimiterOverloaded
+from app.deadline import Deadline
+from app.hashtags import hashtag_provider
+from app.history import request_history
+from app.engine import DominanceEngine, generation_cache, generation_cache_key
+from app.radar import radar_cache, radar_flight, arefresh_profile
+from app.telemetry import get_logger
+
+settings = get_settings()
+log = get_logger("prewarm")
+
+def parse_windows(spec: str) -> list:
+    """
+    "03:00-07:00,14:00-15:00" -> [(180, 420), (840, 900)] بالدقائق. النافذة قد تتجاوز منتصف الليل.
+    """
+    windows = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        start, end = (datetime.strptime(t.strip(), "%H:%M") for t in part.split("-"))
+        windows.append((start.hour * 60 + start.minute, end.hour * 60 + end.minute))
+    return windows
+
+def window_end(now: datetime, windows: list):
+    """
+    نهاية النافذة الحالية، أو None خارج كل النوافذ. بدون نوافذ = مفتوح دائماً لمدة PREWARM_INTERVAL.
+    """
+    if not windows:
+        return now + timedelta(seconds=settings.PREWARM_INTERVAL)
+    minute = now.hour * 60 + now.minute
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for start, end in windows:
+        if start <= end and start <= minute < end:
+            return midnight + timedelta(minutes=end)
+        if start > end and (minute >= start or minute < end):
+            return midnight + timedelta(days=1 if minute >= start else 0, minutes=end)
+    return None
+
+def seconds_until_window(now: datetime, windows: list) -> float:
+    minute = now.hour * 60 + now.minute + now.second / 60
+    return min(((start - minute) % (24 * 60)) * 60 for start, _ in windows)
+
+async def needs_warming(cache: TieredCache, key: str) -> bool:
+    # بدون record: بحث التسخين لا يدخل في نسب إصابة الكاش
+    entry = await cache.aget_entry(key)
+    return entry is None or entry.expires_at - time.time() < min(settings.PREWARM_FRESH_FOR, cache.ttl / 2)
+
+async def mark_if_written(cache: TieredCache, key: str, since: float) -> bool:
+    # المحاولة الفاشلة إما تترك النسخة القديمة، أو تكتب بديلاً بصلاحية أقصر (تخزين سلبي للهاشتاجات،
+    # حزمة متنازلة): كلاهما ليس تسخيناً ولا يدخل جدول warmed
+    entry = await cache.aget_entry(key)
+    if entry is None or entry.stored_at < since or entry.expires_at - entry.stored_at < cache.ttl:
+        return False
+    await cache.amark_warmed(key)
+    return True
+
+def load_targets():
+    """
+    (نيشات الهاشتاجات، نيشات الرادار، [(الطلب، اللغات، رادار)]) من ملف الأهداف ثم من السجل.
+    نفس الطلب بعدة لغات يُجمع ليُولَّد مرة ويُترجم للباقي.
+    """
+    niches, radar_niches, grouped = {}, {}, {}
+
+    def add(request: dict, languages: list, radar_mode: bool):
+        request = DominanceRequest(**request)
+        key = (request.model_dump_json(), radar_mode)
+        entry = grouped.setdefault(key, (request, [], radar_mode))
+        entry[1].extend(lang for lang in languages if lang not in entry[1])
+        niches.setdefault(normalize_text(request.dna.niche), request.dna.niche)
+        if radar_mode:
+            radar_niches.setdefault(normalize_text(request.dna.niche), request.dna.niche)
+
+    if settings.PREWARM_TARGETS_PATH:
+        with open(settings.PREWARM_TARGETS_PATH, encoding="utf-8") as f:
+            targets = json.load(f)
+        for niche in targets.get("niches", []):
+            niches.setdefault(normalize_text(niche), niche)
+        for niche in targets.get("radar_niches", []):
+            niches.setdefault(normalize_text(niche), niche)
+            radar_niches.setdefault(normalize_text(niche), niche)
+        for item in targets.get("requests", []):
+            add(item["request"], item.get("languages") or ["English"], item.get("radar_mode", False))
+
+    for item in request_history.top(settings.PREWARM_HISTORY_TOP, settings.PREWARM_HISTORY_WINDOW):
+        add(item["request"], [item["language"]], item["radar_mode"])
+
+    return list(niches.values()), list(radar_niches.values()), list(grouped.values())
+
+class Prewarmer:
+    def __init__(self):
+        self.counts = Counter()
+        self._semaphore = asyncio.Semaphore(settings.PREWARM_CONCURRENCY)
+
+    async def run_cycle(self, until: float):
+        """
+        دورة واحدة: الهاشتاجات (بدون حصة النموذج)، ثم الرادار، ثم حزم التوليد التي تعتمد عليه.
+        لا تبدأ مهمة جديدة بعد until.
+        """
+        self.counts.clear()
+        niches, radar_niches, requests = load_targets()
+        log.info("🔥 Prewarm cycle", niches=len(niches), radar_niches=len(radar_niches), requests=len(requests))
+        started = time.monotonic()
+
+        await asyncio.gather(*(self._attempt("hashtags", lambda n=n: self.warm_hashtags(n), until) for n in niches))
+        await asyncio.gather(*(self._attempt("radar", lambda n=n: self.warm_radar(n), until) for n in radar_niches))
+        await asyncio.gather(*(
+            self._attempt("generation", lambda r=r: self.warm_request(*r), until) for r in requests
+        ))
+
+        log.info(
+            "🔥 Prewarm done", seconds=round(time.monotonic() - started, 1),
+            **{f"{kind}_{result}": n for (kind, result), n in sorted(self.counts.items())},
+        )
+        return dict(self.counts)
+
+    async def _attempt(self, kind: str, work, until: float):
+        async with self._semaphore:
+            while True:
+                if time.time() >= until:
+                    self.counts[kind, "deferred"] += 1
+                    return
+                try:
+                    result = await work()
+                except LimiterOverloaded as e:
+                    # حصة التسخين نفدت: ننتظر امتلاءها بدل الاقتطاع من حصة الطلبات الحية
+                    if time.time() + e.retry_after >= until:
+                        self.counts[kind, "deferred"] += 1
+                        return
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except Exception as e:
+                    log.warning("⚠️ Prewarm Error", kind=kind, error=str(e))
+                    self.counts[kind, "failed"] += 1
+                    return
+                self.counts[kind, result] += 1
+                return
+
+    async def warm_hashtags(self, niche: str) -> str:
+        if not os.getenv("RAPID_API_KEY"):
+            return "skipped"
+        key = normalize_text(niche)
+        if not await needs_warming(hashtag_provider.cache, key):
+            return "fresh"
+        since = time.time()
+        await hashtag_provider.refresh(niche)
+        return "warmed" if await mark_if_written(hashtag_provider.cache, key, since) else "failed"
+
+    async def warm_radar(self, niche: str) -> str:
+        if not os.getenv("APIFY_TOKEN"):
+            return "skipped"
+        key = normalize_text(niche)
+        if not await needs_warming(radar_cache, key):
+            return "fresh"
+        entry = await radar_cache.aget_entry(key)
+        since = time.time()
+        await radar_flight.do(key, lambda: arefresh_profile(niche, entry.value if entry is not None else None))
+        return "warmed" if await mark_if_written(radar_cache, key, since) else "failed"
+
+    async def warm_request(self, request: DominanceRequest, languages: list, radar_mode: bool) -> str:
+        reference_dna = await DominanceEngine.resolve_reference_dna(request, radar_mode=radar_mode)
+        keys = {language: generation_cache_key(request, language, reference_dna) for language in languages}
+        stale = [language for language, key in keys.items() if await needs_warming(generation_cache, key)]
+        if not stale:
+            return "fresh"
+        since = time.time()
+        # لغة واحدة تُولَّد والباقي يُترجم (نفس مسار /generate/languages)
+        await DominanceEngine.aprocess_languages(
+            request, stale, radar_mode=radar_mode, refresh=True, deadline=Deadline(settings.JOB_DEADLINE)
+        )
+        warmed = [await mark_if_written(generation_cache, keys[language], since) for language in stale]
+        return "warmed" if all(warmed) else "failed"
+
+def report(window: float = 86400) -> dict:
+    """
+    لكل كاش: عدد المداخل المُسخّنة خلال window، وكم منها خُدم مرة على الأقل قبل تغييره.
+    نسبة الطلبات المخدومة من التسخين وقت الذروة: dominator_cache_warm_hits_total في /metrics.
+    """
+    conn, lock = get_connection(settings.CACHE_DB_PATH)
+    with lock:
+        rows = conn.execute(
+            "SELECT namespace, COUNT(*), SUM(hits > 0), SUM(hits) FROM warmed WHERE warmed_at >= ? GROUP BY namespace",
+            (time.time() - window,),
+        ).fetchall()
+    return {
+        namespace: {"warmed": warmed, "served": served, "served_rate": served / warmed if warmed else 0.0, "hits": hits}
+        for namespace, warmed, served, hits in rows
+    }
+
+async def serve(once: bool = False):
+    llm_limiter.limit_share("prewarm", settings.PREWARM_QUOTA_SHARE)
+    windows = parse_windows(settings.PREWARM_WINDOWS)
+    prewarmer = Prewarmer()
+    if once:
+        await prewarmer.run_cycle(until=time.time() + settings.PREWARM_INTERVAL)
+        return
+
+    while True:
+        now = datetime.now()
+        end = window_end(now, windows)
+        if end is None:
+            wait = seconds_until_window(now, windows)
+            log.info("💤 Outside pre-warm window", sleep_s=round(wait))
+            await asyncio.sleep(max(1.0, min(wait, 3600)))
+            continue
+        started = time.time()
+        await prewarmer.run_cycle(until=end.timestamp())
+        await asyncio.sleep(max(1.0, settings.PREWARM_INTERVAL - (time.time() - started)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true")
+    parser.add_argument("--report", action="store_true")
+    args = parser.parse_args()
+    if args.report:
+        print(json.dumps(report(), indent=2, ensure_ascii=False))
+        return
+    asyncio.run(serve(once=args.once))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 # SYSTEM PROMPTS FOR AI DOMINATOR
+from app.tokens import fit_to_budget
 
+# يجب رفع هذا الرقم عند أي تعديل على البرومبتات (يدخل في مفتاح الكاش)
+PROMPT_VERSION = "3"
+
+# يُرسل مرة واحدة كـ system_instruction للنموذج (app/models.py) وليس داخل كل برومبت
 DOMINATOR_SYSTEM_PROMPT = """
 You are the AI DOMINATOR. Your goal is to engineer Viral TikTok Content.
 
@@ -51,8 +56,69 @@ def generate_user_prompt(topic: str, tone: str, niche: str, audience: str, langu
     RETURN JSON ONLY.
     """
 
-# برومبت خاص لاستخراج DNA من النص المفرغ
-def generate_dna_analysis_prompt(transcript: str) -> str:
+# برومبت لدمج عدة طلبات صغيرة في استدعاء واحد (يُرسل بدون تعليمات النظام فيحمل القواعد والمخطط كاملين)
+def generate_batch_prompt(entries: list, language: str) -> str:
+    lines = "\n".join(
+        f'    {i}. Topic: {e["topic"]} | Niche: {e["niche"]} | Audience: {e["audience"]} | Tone: {e["tone"]}'
+        for i, e in enumerate(entries)
+    )
+    return f"""
+    TASK: Generate Viral Content for EACH item below (independently).
+    TARGET LANGUAGE: {language}
+
+    ITEMS:
+{lines}
+
+    Analyze viral potential and generate original structure for every item.
+    Output VALUES in the target language, keep JSON keys in ENGLISH and LOWERCASE,
+    and write detailed cinematic descriptions for visuals.
+
+    RETURN JSON ONLY in this shape:
+    {{"items": [{{"id": 0, "score_data": {{"score": 88, "why": ["Reason"], "fix": "Fix explanation"}}, "hooks": [{{"type": "Type", "text": "Text", "visual": "Visual"}}], "script": [{{"time": "00:00", "type": "Scene", "text": "Script", "screen": "Overlay", "visual": "Action"}}], "hashtags": ["#tag"], "caption": "Caption", "flex": "Flex Text"}}]}}
+    One entry per item, same order, "id" = item number.
+    """
+
+# برومبت تكميلي: طلب قسم واحد فقط ناقص من رد سابق بدل إعادة التوليد كاملاً
+SECTION_SCHEMAS = {
+    "score_data": '{"score_data": {"score": 88, "why": ["Reason"], "fix": "Fix explanation"}}',
+    "hooks": '{"hooks": [{"type": "Type", "text": "Text", "visual": "Visual"}]}',
+    "script": '{"script": [{"time": "00:00", "type": "Scene", "text": "Script", "screen": "Overlay", "visual": "Action"}]}',
+}
+
+def generate_section_prompt(section: str, topic: str, tone: str, niche: str, audience: str, language: str, reference_dna: str = None, context: str = "") -> str:
+    dna_line = f"Follow this viral structure: {reference_dna}" if reference_dna else ""
+    return f"""
+    TASK: Generate ONLY the "{section}" section of a viral content pack.
+    TARGET LANGUAGE: {language}
+
+    CONTEXT:
+    Topic: {topic} | Niche: {niche} | Audience: {audience} | Tone: {tone}
+    {dna_line}
+
+    ALREADY GENERATED (stay consistent with it):
+    {context}
+
+    RETURN JSON ONLY in this shape:
+    {SECTION_SCHEMAS[section]}
+    """
+
+# برومبت تعديل حزمة موضوع قريب بدل توليد كامل: النصوص فقط والهيكل يبقى كما هو
+def generate_refine_prompt(source_json: str, source_topic: str, topic: str, niche: str, audience: str, tone: str, language: str) -> str:
+    return f"""
+    TASK: This viral TikTok content pack was written for the topic "{source_topic}".
+    Adapt it to the new topic "{topic}" (Niche: {niche} | Audience: {audience} | Tone: {tone}).
+    Rewrite only what the new topic changes. Keep the same number of items in the same order,
+    keep JSON keys in English and VALUES in {language}.
+
+    SOURCE:
+    {source_json}
+
+    RETURN JSON ONLY in the same shape as SOURCE.
+    """
+
+# برومبت خاص لاستخراج DNA من النص المفرغ (النص الطويل يُقص إلى max_tokens)
+def generate_dna_analysis_prompt(transcript: str, max_tokens: int = 0) -> str:
+    transcript = fit_to_budget(transcript, max_tokens)
     return f"""
     TASK: Reverse Engineer this TikTok Transcript.
     Extract the "Viral DNA" (The underlying structure that made it successful).
@@ -68,3 +134,37 @@ def generate_dna_analysis_prompt(transcript: str) -> str:
     
     Keep it concise. This will be fed into another AI to generate a new video.
     """
+
+# برومبت دمج DNA عدة فيديوهات ناجحة في ملف واحد للنيش
+def generate_radar_merge_prompt(niche: str, summaries: list) -> str:
+    joined = "\n\n".join(f"VIDEO {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+    return f"""
+    TASK: Merge these Viral DNA analyses of the top TikTok videos in the niche "{niche}".
+    Find the patterns they SHARE, not the details of any single video.
+
+    {joined}
+
+    OUTPUT FORMAT (Text Summary):
+    1. Dominant Hook Types (most common first).
+    2. Typical Pacing.
+    3. Recurring Emotional Arcs.
+    4. Winning Call to Action structures.
+
+    Keep it concise. This will be fed into another AI to generate a new video.
+    """
+
+# برومبت ترجمة حزمة جاهزة (النصوص فقط) بدل توليد إبداعي كامل لكل لغة
+def generate_translate_prompt(source_json: str, source_language: str, target_languages: list) -> str:
+    targets = ", ".join(target_languages)
+    return f"""
+    TASK: Translate the VALUES of this viral TikTok content pack from {source_language} to: {targets}.
+    Keep the same number of items in the same order, and keep JSON keys in English.
+    Adapt idioms and hooks so they sound native on TikTok; do not add or remove content.
+
+    SOURCE:
+    {source_json}
+
+    RETURN JSON ONLY in this shape:
+    {{"translations": {{"<language>": <same shape as SOURCE>}}}}
+    One entry per target language, named exactly: {targets}.
+    """
@@ -0,0 +1,123 @@
+import time
+import asyncio
+from app.config import get_settings
+from app.cache import TieredCache, normalize_text
+from app.singleflight import SingleFlight
+from app.telemetry import get_logger, record_usage
+from app.deadline import set_deadline
+from app.limiter import llm_limiter, estimate_tokens
+from app.models import DNA_MODEL_NAME, get_model
+from app.prompts import generate_radar_merge_prompt
+from app.engine import (
+    arun_tiktok_scraper, aanalyze_dna_with_ai, dna_cache, run_stage, DNA_FALLBACK
+)
+
+settings = get_settings()
+log = get_logger("radar")
+
+# ملف DNA مجمّع لكل نيش: يُخدم قديماً أثناء تحديثه في الخلفية
+radar_cache = TieredCache(
+    "radar_profiles",
+    ttl=settings.RADAR_PROFILE_TTL,
+    stale_ttl=settings.RADAR_STALE_TTL,
+    memory_size=256,
+    disk_size=2000,
+)
+radar_flight = SingleFlight("radar")
+_background = set()
+
+async def aget_niche_dna(niche: str):
+    """
+    DNA مجمّع لأفضل فيديوهات النيش. نسخة حديثة من الكاش فوراً، ونسخة قديمة
+    فوراً مع تحديث تدريجي في الخلفية، وبناء كامل فقط للنيش الجديد.
+    """
+    key = normalize_text(niche)
+    entry = await radar_cache.aget_entry(key)
+    await radar_cache.arecord(entry, key)
+    if entry is not None:
+        if not entry.fresh:
+            task = asyncio.ensure_future(_refresh_in_background(key, niche, entry.value))
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        return entry.value.get("profile")
+
+    profile = await radar_flight.do(key, lambda: arefresh_profile(niche))
+    return profile.get("profile") if profile else None
+
+async def _refresh_in_background(key: str, niche: str, previous: dict):
+    # التحديث لا ينتهي بانتهاء ميزانية الطلب الذي صادف النسخة القديمة
+    set_deadline(None)
+    await radar_flight.do(key, lambda: arefresh_profile(niche, previous))
+
+async def arefresh_profile(niche: str, previous: dict = None):
+    """
+    تشغيل واحد للـ scraper لكل النيش، ثم تحليل الفيديوهات الجديدة فقط (بالتوازي)،
+    ودمج النتائج مع ما حُلل سابقاً في ملف واحد.
+    يعمل في مهمة مستقلة (radar_flight) فلا يرث ميزانية الطلب الذي بدأه.
+    """
+    set_deadline(None)
+    log.info("📡 Radar Scanning Niche", niche=niche)
+    try:
+        items = await arun_tiktok_scraper({
+            "searchQueries": [niche],
+            "hashtags": [niche.replace(" ", "").lower()],
+            "resultsPerPage": settings.RADAR_TOP_N,
+        }, timeout=settings.RADAR_TIMEOUT)
+    except Exception as e:
+        log.warning("⚠️ Radar Error", niche=niche, error=str(e))
+        return previous
+    top = sorted(
+        (item for item in items if item.get("id") and item.get("text")),
+        key=lambda item: item.get("playCount", 0),
+        reverse=True,
+    )[:settings.RADAR_TOP_N]
+    if not top:
+        return previous
+
+    videos = dict((previous or {}).get("videos", {}))
+    semaphore = asyncio.Semaphore(settings.RADAR_ANALYSIS_CONCURRENCY)
+
+    async def analyze(item):
+        video_id = str(item["id"])
+        if videos.get(video_id, {}).get("dna"):
+            return
+        # نفس كاش وضع الاستنساخ: الفيديو الذي استنسخه أحد المستخدمين لا يُحلل مرة أخرى
+        cached = await dna_cache.aget(f"tiktok:{video_id}") or {}
+        dna = cached.get("dna")
+        if not dna:
+            async with semaphore:
+                dna = await run_stage("radar_dna", aanalyze_dna_with_ai(item["text"]), settings.DNA_TIMEOUT)
+            if not dna or dna == DNA_FALLBACK:
+                return
+            await dna_cache.aset(f"tiktok:{video_id}", {"transcript": item["text"], "dna": dna})
+        videos[video_id] = {"dna": dna, "plays": item.get("playCount", 0)}
+
+    await asyncio.gather(*(analyze(item) for item in top))
+
+    # نحتفظ بأقوى الفيديوهات فقط (الحالية والسابقة معاً)
+    ranked = sorted(videos.items(), key=lambda pair: pair[1].get("plays", 0), reverse=True)[:settings.RADAR_TOP_N]
+    videos = dict(ranked)
+    if not videos:
+        return previous
+
+    summaries = [video["dna"] for video in videos.values()]
+    if previous and set(videos) == set(previous.get("videos", {})):
+        merged = previous.get("profile")
+    else:
+        merged = await amerge_profiles(niche, summaries)
+
+    profile = {"niche": niche, "videos": videos, "profile": merged, "refreshed_at": time.time()}
+    await radar_cache.aset(normalize_text(niche), profile)
+    return profile
+
+async def amerge_profiles(niche: str, summaries: list) -> str:
+    try:
+        model = get_model(DNA_MODEL_NAME)
+        prompt = generate_radar_merge_prompt(niche, summaries)
+        response = await llm_limiter.run(lambda: model.generate_content_async(prompt), estimate_tokens(prompt))
+        record_usage(response, DNA_MODEL_NAME, call="radar_merge")
+        return response.text
+    except Exception as e:
+        log.warning("⚠️ Radar Merge Error", niche=niche, error=str(e))
+        # بدون دمج: أول ملخصين يكفيان كمرجع
+        return "\n\n".join(summaries[:2])
@@ -0,0 +1,80 @@
+from app.normalizer import loads, decode, pick, TOP_LEVEL_ALIASES
+
+# الأقسام التي لا تكتمل الحزمة بدونها -> اسم القسم الذي نطلبه في الاستدعاء التكميلي
+REQUIRED_SECTIONS = {"score": "score_data", "hooks": "hooks", "script": "script"}
+
+CLOSERS = {"{": "}", "[": "]"}
+
+def _strip_trailing_comma(out: list):
+    while out and out[-1] in " \t\r\n":
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+def repair_json(text: str) -> str:
+    """
+    إصلاح عيوب JSON الشائعة في ردود النموذج:
+    - كلام أو ```json قبل الكائن وبعده.
+    - فواصل زائدة قبل } أو ].
+    - رد مقطوع: نرجع لآخر قيمة مكتملة ونغلق الأقواس المفتوحة،
+      فنحتفظ بكل خطاف ومشهد اكتمل ونسقط الجزء الناقص فقط.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object in model output")
+
+    out, stack = [], []
+    in_string = escape = False
+    safe = None  # (طول المخرجات, الأقواس المفتوحة) بعد آخر قيمة مكتملة
+
+    for ch in text[min(starts):]:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+            out.append(ch)
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            if not stack:
+                break
+            _strip_trailing_comma(out)
+            out.append(CLOSERS[stack.pop()])
+            safe = (len(out), tuple(stack))
+            if not stack:
+                break
+        else:
+            out.append(ch)
+
+    if stack:
+        if safe is None:
+            raise ValueError("Model output truncated before any complete value")
+        length, open_brackets = safe
+        out = out[:length]
+        _strip_trailing_comma(out)
+        out.extend(CLOSERS[b] for b in reversed(open_brackets))
+    return "".join(out)
+
+def salvage_json(text: str):
+    """
+    فك الرد بشكل صارم أولاً (بعد حذف ```json والكلام المحيط)، ثم بعد الإصلاح.
+    يرفع ValueError إذا لم يبق شيء صالح.
+    """
+    try:
+        return decode(text)
+    except ValueError:
+        pass
+    return loads(repair_json(text))
+
+def missing_sections(data) -> list:
+    fields = pick(data, TOP_LEVEL_ALIASES) if isinstance(data, dict) else {}
+    return [section for field, section in REQUIRED_SECTIONS.items() if not fields.get(field)]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Union
 from enum import Enum
 
 # --- Enums (Constants) ---
@@ -32,35 +32,81 @@ class DominanceRequest(BaseModel):
     tone: ContentTone = ContentTone.CONTROVERSIAL
     dna: CreatorDNA
 
+class DominanceBatchRequest(BaseModel):
+    """
+    طلب توليد جماعي: الطلبات المكررة تُنفذ مرة واحدة
+    """
+    items: List[DominanceRequest]
+    language: str = "English"
+    refresh: bool = False
+    # أكثر من 1 يعني دمج عدة طلبات صغيرة في استدعاء واحد للنموذج
+    pack_size: int = Field(default=1, ge=1)
+
+class JobRequest(BaseModel):
+    """
+    طلب مهمة خلفية: للاستنساخ والرادار اللذين يتجاوزان مهلة طلب HTTP
+    """
+    request: DominanceRequest
+    language: str = "English"
+    video_url: Optional[str] = None
+    radar_mode: bool = False
+    refresh: bool = False
+
 # --- Outputs (Response Models) ---
 
+# نفس هيكل الحزمة بعد app.normalizer.normalize_response (الأرقام في الحقول النصية تُقبل كنص)
 class HookVariant(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)
     type: str = Field(..., example="A (Visual Shock)")
     text: str
-    visual_cue: str
+    visual: str
 
 class DominanceScore(BaseModel):
-    score: int = Field(..., ge=0, le=100, description="تنبؤ قوة الفيديو 0-100")
-    why: List[str] = Field(..., description="لماذا حصل على هذه الدرجة؟")
-    minimum_fix: str = Field(..., description="التعديل الواحد الحاسم لتحسين النتيجة")
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    score: Union[int, float, str] = Field(..., description="تنبؤ قوة الفيديو 0-100")
+    why: Union[List[str], str] = Field(..., description="لماذا حصل على هذه الدرجة؟")
+    fix: str = Field(..., description="التعديل الواحد الحاسم لتحسين النتيجة")
 
 class ContentSection(BaseModel):
-    time_start: str
-    time_end: str
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    time: str
     type: str  # Hook, Value, CTA
-    script: str
-    screen_text: str
-    visual_direction: str
+    text: str
+    screen: str
+    visual: str
 
 class AlphaPack(BaseModel):
     """
     الحزمة النهائية: المنتج الذي يتسلمه المستخدم
     """
-    title: str
-    dominance_score: DominanceScore
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+    score_data: DominanceScore
     hooks: List[HookVariant]
-    script_timeline: List[ContentSection]
+    script: List[ContentSection]
     hashtags: List[str]
     caption: str
     # هذا الحقل إجباري لخاصية الفيروسية (توجيهنا الأول)
-    viral_flex_text: str = Field(..., description="النص الذي يظهر في بطاقة المشاركة")
\ No newline at end of file
+    flex: str = Field(..., description="النص الذي يظهر في بطاقة المشاركة")
+    # المراحل التي تُجوزت أو انتهت مهلتها للبقاء ضمن ميزانية الطلب
+    degradations: List[str] = Field(default_factory=list)
+
+class BatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+
+class DominanceBatchResponse(BaseModel):
+    results: List[BatchItemResult]
+
+class MultiLanguageResponse(BaseModel):
+    # {اللغة: الحزمة} بنفس ترتيب اللغات المطلوبة
+    packs: Dict[str, dict]
+    degradations: List[str] = Field(default_factory=list)
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str = Field(..., description="queued | running | done | failed")
+    created_at: float
+    updated_at: float
+    error: Optional[str] = None
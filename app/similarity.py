@@ -0,0 +1,134 @@
+import re
+import zlib
+import random
+import threading
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+
+# التشكيل وعلامات القرآن والتطويل تُحذف، والحروف المتقاربة تُوحد قبل المقارنة
+TASHKEEL = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+ARABIC_FOLD = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ی": "ي",
+    "ة": "ه", "ؤ": "و", "ک": "ك",
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06f0 + d): str(d) for d in range(10)},
+})
+NON_WORD = re.compile(r"[\W_]+")
+
+MERSENNE = (1 << 61) - 1
+
+def normalize_topic(text: str) -> str:
+    """
+    توحيد الموضوع للمقارنة: أشكال العرض العربية (NFKC)، حذف التشكيل، توحيد الألف والياء
+    والتاء المربوطة، تجاهل حالة الأحرف وعلامات الترقيم والفراغات.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = TASHKEEL.sub("", text).translate(ARABIC_FOLD).casefold()
+    return " ".join(NON_WORD.sub(" ", text).split())
+
+def shingles(text: str, n: int = 3) -> set:
+    # n-grams حرفية داخل كل كلمة (مع حدودها): ترتيب الكلمات لا يغير المجموعة
+    grams = set()
+    for word in normalize_topic(text).split():
+        padded = f" {word} "
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        grams.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+def topic_words(text: str) -> Counter:
+    # نفس الكلمات بنفس التكرار = نفس الموضوع مهما اختلف الترتيب أو التشكيل أو الحالة
+    return Counter(normalize_topic(text).split())
+
+def jaccard(a: str, b: str) -> float:
+    """
+    تشابه Jaccard الفعلي بين مجموعتي shingles (التوقيع في الفهرس تقدير فقط).
+    """
+    first, second = shingles(a), shingles(b)
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+class TopicIndex:
+    """
+    فهرس تقارب داخل العملية (MinHash + LSH) للمواضيع السابقة: بدون شبكة ولا GPU.
+    كل مدخل = (مفتاح، نطاق، توقيع، قيمة)؛ المقارنة فقط داخل نفس النطاق (نفس النبرة والنيش واللغة...).
+    الحجم محدود بـ max_entries والأقدم استخداماً يُحذف أولاً.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_entries: int = 5000, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, MERSENNE), rng.randrange(0, MERSENNE)) for _ in range(num_perm)]
+        self._entries = OrderedDict()
+        self._buckets = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def signature(self, text: str) -> array:
+        hashes = [zlib.crc32(g.encode("utf-8")) for g in shingles(text)]
+        if not hashes:
+            return array("Q", [MERSENNE] * self.num_perm)
+        return array("Q", (min((a * h + b) % MERSENNE for h in hashes) for a, b in self._perms))
+
+    def _band_keys(self, scope: str, signature: array) -> list:
+        return [
+            hash((scope, i, tuple(signature[i * self.rows:(i + 1) * self.rows])))
+            for i in range(self.bands)
+        ]
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry[2]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def add(self, key: str, text: str, scope: str, value=None):
+        signature = self.signature(text)
+        band_keys = self._band_keys(scope, signature)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (signature, value, band_keys)
+            for band_key in band_keys:
+                self._buckets[band_key].add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def discard(self, key: str):
+        with self._lock:
+            self._drop(key)
+
+    def query(self, text: str, scope: str, threshold: float) -> list:
+        """
+        [(التشابه التقديري، المفتاح، القيمة)] للمدخلات التي تتجاوز threshold، الأقرب أولاً.
+        """
+        signature = self.signature(text)
+        band_keys = self._band_keys(scope, signature)
+        with self._lock:
+            candidates = set()
+            for band_key in band_keys:
+                candidates.update(self._buckets.get(band_key, ()))
+            matches = []
+            for key in candidates:
+                other, value, _ = self._entries[key]
+                similarity = sum(x == y for x, y in zip(signature, other)) / self.num_perm
+                if similarity >= threshold:
+                    matches.append((similarity, key, value))
+                    self._entries.move_to_end(key)
+        matches.sort(key=lambda m: m[0], reverse=True)
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,70 @@
+import asyncio
+from app.deadline import Deadline, DeadlineExceeded, current_deadline, set_deadline
+
+class _Call:
+    def __init__(self, task: asyncio.Task, budget: Deadline):
+        self.task = task
+        self.budget = budget
+        self.waiters = 0
+
+async def _detached(factory, budget: Deadline):
+    # العملية المشتركة تعمل بميزانيتها هي (المهمة تنسخ الـ context عند إنشائها)، لا ميزانية أول طالب فقط
+    set_deadline(budget)
+    return await factory()
+
+class SingleFlight:
+    """
+    دمج الطلبات المتطابقة الجارية: أول طلب ينفذ العملية، والبقية ينتظرون نفس النتيجة
+    (أو نفس الخطأ). إلغاء أحد المنتظرين لا يلغي العملية إلا إذا كان آخرهم.
+    العملية تعمل بميزانية أبعد المنتظرين (تمتد عند انضمام منتظر بميزانية أطول) فتتنازل مراحلها
+    كما في الطلب المنفرد؛ المنتظر الأقصر ميزانية محدود بميزانيته هو، وتنازلات العملية تُنسخ لكل منتظر.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, factory):
+        deadline = current_deadline()
+        call = self._calls.get(key)
+        if call is None:
+            budget = Deadline(0)
+            budget.extend(deadline)
+            call = _Call(asyncio.ensure_future(_detached(factory, budget)), budget)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.coalesced += 1
+            call.budget.extend(deadline)
+
+        call.waiters += 1
+        try:
+            if deadline is None or deadline.expires_at >= call.budget.expires_at:
+                # ميزانية العملية هي ميزانيتنا: مراحلها تتنازل قبل انتهائها
+                return await asyncio.shield(call.task)
+            return await asyncio.wait_for(asyncio.shield(call.task), deadline.remaining())
+        except asyncio.TimeoutError:
+            self._abandon(key, call)
+            raise DeadlineExceeded(f"Request deadline of {deadline.seconds:g}s exceeded waiting for {self.name}")
+        except asyncio.CancelledError:
+            self._abandon(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+            if deadline is not None:
+                for what in call.budget.degradations:
+                    deadline.degrade(what)
+
+    def _abandon(self, key: str, call: _Call):
+        if call.waiters == 1 and not call.task.done():
+            # لا أحد غيرنا ينتظر: نلغي العملية ونحررها لأي طلب جديد
+            self._forget(key, call)
+            call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def __len__(self):
+        return len(self._calls)
@@ -0,0 +1,92 @@
+import json
+
+# أسماء الأقسام التي نرسلها فور اكتمالها (كل البدائل التي يستخدمها النموذج)
+HOOK_KEYS = {"hooks"}
+SCENE_KEYS = {"script", "script_timeline", "timeline"}
+SCORE_KEYS = {"score_data", "dominance_score"}
+
+class IncrementalJSONParser:
+    """
+    قارئ JSON تدريجي: يُغذّى بأجزاء النص القادمة من النموذج، ويعيد كل خطاف
+    أو مشهد أو سكور بمجرد إغلاق الكائن الخاص به، دون انتظار نهاية الرد.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.stack = []  # [(نوع الحاوية, المفتاح الذي تقع تحته, موضع البداية)]
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.last_string = None
+        self.pending_key = None
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        events = []
+        while self.pos < len(self.buffer):
+            ch = self.buffer[self.pos]
+            i = self.pos
+            self.pos += 1
+
+            if not self.started:
+                # تجاهل أي نص أو ```json قبل بداية الكائن
+                if ch != "{":
+                    continue
+                self.started = True
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self.last_string = self.buffer[self.string_start:i + 1]
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch == ":":
+                self.pending_key = self._decode_key(self.last_string)
+            elif ch == ",":
+                self.pending_key = None
+            elif ch in "{[":
+                if self.stack and self.stack[-1][0] == "[":
+                    key = self.stack[-1][1]
+                else:
+                    key = self.pending_key
+                self.stack.append((ch, key, i))
+                self.pending_key = None
+            elif ch in "}]" and self.stack:
+                kind, key, start = self.stack.pop()
+                if kind == "{":
+                    event = self._classify(key)
+                    if event:
+                        try:
+                            events.append((event, json.loads(self.buffer[start:i + 1])))
+                        except ValueError:
+                            pass
+        return events
+
+    def _classify(self, key):
+        depth = len(self.stack)
+        if depth == 1 and key in SCORE_KEYS:
+            return "score"
+        if depth == 2 and self.stack[-1][0] == "[":
+            if key in HOOK_KEYS:
+                return "hook"
+            if key in SCENE_KEYS:
+                return "scene"
+        return None
+
+    @staticmethod
+    def _decode_key(raw):
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw).lower()
+        except ValueError:
+            return None
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from app.config import get_settings
+
+settings = get_settings()
+
+# رقم تتبع لكل طلب يظهر في كل سطر سجل أثناء تنفيذه
+trace_id_var = ContextVar("trace_id", default="-")
+
+def new_trace_id(incoming: str = None) -> str:
+    trace_id = incoming or uuid.uuid4().hex[:16]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "msg": record.getMessage(),
+            "trace_id": trace_id_var.get(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class StructuredLogger:
+    """
+    سجلات بصيغة JSON (سطر لكل حدث) بدل print: log.info("🚀 Engaging", model=...)
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, msg, fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, extra={"fields": fields})
+
+    def debug(self, msg, **fields): self._log(logging.DEBUG, msg, fields)
+    def info(self, msg, **fields): self._log(logging.INFO, msg, fields)
+    def warning(self, msg, **fields): self._log(logging.WARNING, msg, fields)
+    def error(self, msg, **fields): self._log(logging.ERROR, msg, fields)
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(f"dominator.{name}")
+
+_root = logging.getLogger("dominator")
+if not _root.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(JsonFormatter())
+    _root.addHandler(_handler)
+    _root.setLevel(settings.LOG_LEVEL.upper())
+    _root.propagate = False
+
+# --- Prometheus ---
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 60, 120, 300)
+
+STAGE_LATENCY = Histogram(
+    "dominator_stage_seconds", "Latency of each engine stage", ["stage", "status"], buckets=LATENCY_BUCKETS
+)
+REQUEST_LATENCY = Histogram(
+    "dominator_request_seconds", "End-to-end HTTP request latency", ["path", "status"], buckets=LATENCY_BUCKETS
+)
+LLM_RETRIES = Counter("dominator_llm_retries_total", "LLM call retries", ["reason"])
+LLM_SHED = Counter("dominator_llm_shed_total", "LLM calls rejected by the limiter")
+LLM_TOKENS = Counter("dominator_llm_tokens_total", "Tokens reported by Gemini usage metadata", ["model", "call", "kind"])
+CACHE_LOOKUPS = Counter("dominator_cache_lookups_total", "Cache lookups", ["cache", "result"])
+CACHE_WARM_HITS = Counter("dominator_cache_warm_hits_total", "Fresh cache hits on entries written by the pre-warmer", ["cache"])
+HEDGE_CALLS = Counter("dominator_hedge_calls_total", "Calls eligible for hedging", ["hedger"])
+HEDGES = Counter("dominator_hedges_total", "Hedge (duplicate) requests sent", ["hedger"])
+HEDGE_WINS = Counter("dominator_hedge_wins_total", "Winner of each hedged race", ["hedger", "winner"])
+
+@contextmanager
+def span(stage: str, **fields):
+    """
+    قياس زمن مرحلة: يُسجل في الـ histogram وفي سطر سجل مع رقم التتبع.
+    المستدعي يمكنه تغيير الحالة (مثل "timeout") عبر القاموس المُعاد.
+    """
+    info = {"status": "ok", **fields}
+    start = time.perf_counter()
+    try:
+        yield info
+    except BaseException as e:
+        info["status"] = "cancelled" if type(e).__name__ in ("CancelledError", "GeneratorExit") else "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage=stage, status=info["status"]).observe(elapsed)
+        _root.debug("stage", extra={"fields": {"stage": stage, "ms": round(elapsed * 1000, 1), **info}})
+
+def record_usage(response, model_name: str, call: str = "generation"):
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    for kind, attr in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"), ("cached", "cached_content_token_count")):
+        count = getattr(usage, attr, 0) or 0
+        if count:
+            LLM_TOKENS.labels(model=model_name, call=call, kind=kind).inc(count)
+
+def metrics_payload():
+    """
+    مع عدة عمال uvicorn نجمع المقاييس من PROMETHEUS_MULTIPROC_DIR إن كان مضبوطاً.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,72 @@
+import re
+import httpx
+from typing import Optional
+from urllib.parse import urlsplit
+from app.config import get_settings
+from app.cache import TieredCache
+from app.telemetry import get_logger
+
+settings = get_settings()
+log = get_logger("tiktok")
+
+# /@user/video/<id> و /v/<id>.html (الموبايل) و /embed/v2/<id>
+VIDEO_ID_PATTERNS = [
+    re.compile(r"/video/(\d+)"),
+    re.compile(r"/v/(\d+)"),
+    re.compile(r"/embed(?:/v2)?/(\d+)"),
+]
+SHORT_HOSTS = {"vm.tiktok.com", "vt.tiktok.com"}
+
+# الروابط المختصرة لا تتغير وجهتها، لذلك نحفظ نتيجة فكها لمدة طويلة
+short_link_cache = TieredCache("tiktok_short_links", ttl=30 * 86400, memory_size=1024, disk_size=20000)
+
+def is_tiktok_url(url: str) -> bool:
+    if not url:
+        return False
+    host = (urlsplit(url.strip()).hostname or "").lower()
+    return host == "tiktok.com" or host.endswith(".tiktok.com")
+
+def extract_video_id(url: str) -> Optional[str]:
+    path = urlsplit(url.strip()).path
+    for pattern in VIDEO_ID_PATTERNS:
+        match = pattern.search(path)
+        if match:
+            return match.group(1)
+    return None
+
+def is_short_link(url: str) -> bool:
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    return host in SHORT_HOSTS or parts.path.startswith("/t/")
+
+def canonical_video_url(video_id: str) -> str:
+    # تيك توك يقبل أي اسم مستخدم في المسار ويعيد التوجيه للفيديو الصحيح
+    return f"https://www.tiktok.com/@tiktok/video/{video_id}"
+
+async def resolve_video_id(url: str) -> Optional[str]:
+    """
+    تحويل أي صيغة لرابط تيك توك (مختصر، موبايل، مع باراميترات) إلى رقم الفيديو.
+    """
+    if not is_tiktok_url(url):
+        return None
+    video_id = extract_video_id(url)
+    if video_id or not is_short_link(url):
+        return video_id
+
+    parts = urlsplit(url.strip())
+    short_key = f"{(parts.hostname or '').lower()}{parts.path.rstrip('/')}"
+    cached = await short_link_cache.aget(short_key)
+    if cached is not None:
+        return cached
+
+    try:
+        async with httpx.AsyncClient(follow_redirects=True, timeout=settings.SHORT_LINK_TIMEOUT) as client:
+            response = await client.head(url.strip())
+        video_id = extract_video_id(str(response.url))
+    except Exception as e:
+        log.warning("⚠️ Short Link Error", url=url, error=str(e))
+        return None
+
+    if video_id:
+        await short_link_cache.aset(short_key, video_id)
+    return video_id
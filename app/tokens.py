@@ -0,0 +1,29 @@
+import re
+
+# تقدير بدون tokenizer: ~4 أحرف لاتينية لكل توكن، والعربية أكثف (~2.5 حرف لكل توكن)
+ASCII_CHARS_PER_TOKEN = 4
+OTHER_CHARS_PER_TOKEN = 2.5
+TRIM_MARKER = "\n[...]\n"
+_WHITESPACE = re.compile(r"\s+")
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return int(ascii_chars / ASCII_CHARS_PER_TOKEN + (len(text) - ascii_chars) / OTHER_CHARS_PER_TOKEN) + 1
+
+def fit_to_budget(text: str, budget: int, head_share: float = 0.6) -> str:
+    """
+    قص النص الطويل إلى ميزانية توكنز: نحتفظ بالبداية (الخطاف) والنهاية (الدعوة للفعل)
+    ونحذف الوسط، مع القص عند حدود الكلمات.
+    """
+    text = _WHITESPACE.sub(" ", text or "").strip()
+    total = count_tokens(text)
+    if budget <= 0 or total <= budget:
+        return text
+    keep = max(0, int(len(text) * budget / total) - len(TRIM_MARKER))
+    head_len = int(keep * head_share)
+    tail_len = keep - head_len
+    head = text[:head_len].rsplit(" ", 1)[0] if head_len else ""
+    tail = text[len(text) - tail_len:].split(" ", 1)[-1] if tail_len else ""
+    return f"{head}{TRIM_MARKER}{tail}"
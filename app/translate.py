@@ -0,0 +1,51 @@
+import copy
+
+# الحقول النصية فقط تُترجم؛ السكور والتوقيتات والهاشتاجات وعدد العناصر تبقى من الحزمة الأصلية
+HOOK_TEXT = ("type", "text", "visual")
+SCENE_TEXT = ("type", "text", "screen", "visual")
+
+def extract_text(pack: dict) -> dict:
+    return {
+        "why": pack["score_data"]["why"],
+        "fix": pack["score_data"]["fix"],
+        "hooks": [{k: h.get(k, "") for k in HOOK_TEXT} for h in pack["hooks"]],
+        "script": [{k: s.get(k, "") for k in SCENE_TEXT} for s in pack["script"]],
+        "caption": pack["caption"],
+        "flex": pack["flex"],
+    }
+
+def _merge_items(targets: list, sources, keys: tuple):
+    if not isinstance(sources, list) or len(sources) != len(targets):
+        raise ValueError("Translation changed the number of items")
+    for target, source in zip(targets, sources):
+        if not isinstance(source, dict):
+            raise ValueError("Translation returned a malformed item")
+        for key in keys:
+            if isinstance(source.get(key), str):
+                target[key] = source[key]
+
+def apply_text(pack: dict, text: dict) -> dict:
+    """
+    حزمة جديدة بهيكل الأصل ونصوص الترجمة. أي اختلاف في عدد الخطافات أو المشاهد
+    يرفع ValueError (والمستدعي يولّد الحزمة كاملة بدلاً منها).
+    """
+    result = copy.deepcopy(pack)
+    _merge_items(result["hooks"], text.get("hooks"), HOOK_TEXT)
+    _merge_items(result["script"], text.get("script"), SCENE_TEXT)
+    why = text.get("why")
+    if isinstance(why, list) and all(isinstance(w, str) for w in why):
+        result["score_data"]["why"] = why
+    for key, target in (("fix", result["score_data"]), ("caption", result), ("flex", result)):
+        if isinstance(text.get(key), str):
+            target[key] = text[key]
+    return result
+
+def pick_translation(translations: dict, language: str):
+    # النموذج قد يغير حالة أحرف اسم اللغة
+    if language in translations:
+        return translations[language]
+    wanted = language.strip().lower()
+    for name, value in translations.items():
+        if isinstance(name, str) and name.strip().lower() == wanted:
+            return value
+    return None
@@ -0,0 +1,2 @@
+# AI DOMINATOR - Benchmarks
+# سكربتات قياس الأداء (تعمل بنماذج وهمية ولا تستهلك أي حصة حقيقية).
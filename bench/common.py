@@ -0,0 +1,58 @@
+import os
+import json
+import time
+import tempfile
+import subprocess
+import statistics
+
+def isolate_environment():
+    """
+    قواعد بيانات مؤقتة وحصة مفتوحة حتى لا يلمس القياس كاش أو حصة الإنتاج.
+    يجب استدعاؤها قبل استيراد أي شيء من app.
+    """
+    workdir = tempfile.mkdtemp(prefix="dominator-bench-")
+    os.environ.setdefault("CACHE_DB_PATH", os.path.join(workdir, "cache.sqlite3"))
+    os.environ.setdefault("LIMITER_DB_PATH", os.path.join(workdir, "limiter.sqlite3"))
+    os.environ.setdefault("JOBS_DB_PATH", os.path.join(workdir, "jobs.sqlite3"))
+    os.environ.setdefault("HISTORY_DB_PATH", os.path.join(workdir, "history.sqlite3"))
+    os.environ.setdefault("LLM_RPM", "1000000")
+    os.environ.setdefault("LLM_TPM", "1000000000")
+    os.environ.setdefault("LLM_MAX_QUEUE", "100000")
+    os.environ.pop("RAPID_API_KEY", None)
+    os.environ.pop("APIFY_TOKEN", None)
+    return workdir
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "mean": statistics.fmean(samples) if samples else 0.0,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples) if samples else 0.0,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def write_results(name: str, data: dict, output: str = None):
+    """
+    حفظ النتائج بصيغة JSON (مع رقم الـ commit) لمقارنة التراجعات بين النسخ.
+    """
+    record = {"benchmark": name, "commit": git_commit(), "timestamp": time.time(), "results": data}
+    path = output or os.path.join("bench_results", f"{name}-{record['commit']}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2, ensure_ascii=False)
+    print(json.dumps(record, indent=2, ensure_ascii=False))
+    return path
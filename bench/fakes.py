@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import math
+import types
+import random
+import asyncio
+
+# رد نموذجي بنفس شكل ردود Gemini الحقيقية (مفاتيح بحالات أحرف مختلطة كما يحدث فعلاً)
+SAMPLE_PAYLOAD = json.dumps({
+    "Score_Data": {"score": 91, "why": ["Pattern interrupt in first second", "Clear payoff"], "fix": "Cut the intro by 1s"},
+    "hooks": [
+        {"type": "A (Visual Shock)", "text": "You are losing money every time you post", "visual": "Creator rips a receipt"},
+        {"type": "B (Question)", "text": "Why do 90% of agencies stay small?", "visual_cue": "Close-up, raised eyebrow"},
+        {"type": "C (Data)", "text": "3 automations saved us 40 hours/week", "visual": "Screen recording of dashboard"},
+    ],
+    "script": [
+        {"time": "00:00", "type": "Hook", "text": "Stop scrolling. This costs you clients.", "screen": "STOP", "visual": "Hard cut to face"},
+        {"time": "00:03", "type": "Value", "text": "Automation one: onboarding.", "screen": "1/3", "visual": "B-roll of forms"},
+        {"time": "00:10", "type": "Value", "text": "Automation two: reporting.", "screen": "2/3", "visual": "Charts animating"},
+        {"time": "00:18", "type": "Value", "text": "Automation three: follow-ups.", "screen": "3/3", "visual": "Inbox zero"},
+        {"time": "00:25", "type": "CTA", "text": "Follow for the templates.", "screen": "FOLLOW", "visual": "Point at camera"},
+    ],
+    "hashtags": ["#agency", "#automation", "#ai"],
+    "caption": "3 automations every agency needs",
+    "flex": "Built with AI Dominator",
+})
+
+SAMPLE_TRANSCRIPT = "Stop scrolling. Nobody tells beginners this, but the first sale comes from one post, not fifty. Here's the exact format I used."
+
+class Profile:
+    """
+    توزيع زمن الاستجابة والأخطاء لخدمة وهمية: زمن لوغاريتمي-طبيعي بوسيط p50 وذيل p99،
+    مع نسبة أخطاء عامة ونسبة أخطاء 429.
+    """
+
+    def __init__(self, p50: float = 0.0, p99: float = None, error_rate: float = 0.0, throttle_rate: float = 0.0):
+        self.p50 = p50
+        self.p99 = p99 if p99 is not None else p50
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        # 2.326 = z لـ p99 في التوزيع الطبيعي
+        self.sigma = math.log(self.p99 / self.p50) / 2.326 if self.p50 > 0 and self.p99 > self.p50 else 0.0
+
+    def latency(self) -> float:
+        if self.p50 <= 0:
+            return 0.0
+        return self.p50 * math.exp(self.sigma * random.gauss(0, 1))
+
+    def outcome(self) -> str:
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return "throttle"
+        if roll < self.throttle_rate + self.error_rate:
+            return "error"
+        return "ok"
+
+    async def wait(self):
+        delay = self.latency()
+        if delay:
+            await asyncio.sleep(delay)
+
+class FakeRateLimited(Exception):
+    code = 429
+
+class FakeServerError(Exception):
+    code = 503
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+class FakeStream:
+    def __init__(self, text: str, chunk_size: int = 64, delay: float = 0.0):
+        self.chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        self.delay = delay
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield FakeResponse(chunk)
+
+class FakeModel:
+    """
+    بديل محلي لـ genai.GenerativeModel بزمن استجابة وأخطاء قابلة للضبط.
+    """
+
+    def __init__(self, payload: str = SAMPLE_PAYLOAD, latency: float = 0.0, profile: Profile = None):
+        self.payload = payload
+        self.profile = profile or Profile(p50=latency)
+        self.calls = 0
+        self.throttled = 0
+        self.errors = 0
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        self.calls += 1
+        await self.profile.wait()
+        outcome = self.profile.outcome()
+        if outcome == "throttle":
+            self.throttled += 1
+            raise FakeRateLimited("429 Resource has been exhausted retry_delay { seconds: 1 }")
+        if outcome == "error":
+            self.errors += 1
+            raise FakeServerError("503 The model is overloaded")
+        if stream:
+            return FakeStream(self.payload)
+        return FakeResponse(self.payload)
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return FakeResponse(self.payload)
+
+def install_fake_models(model=None):
+    """
+    تسجيل النموذج الوهمي في سجل النماذج بدل SDK جوجل.
+    """
+    from app import models
+    model = model or FakeModel()
+    from app.prompts import DOMINATOR_SYSTEM_PROMPT
+    models.register_model(model, models.MODEL_NAME, models.JSON_CONFIG, DOMINATOR_SYSTEM_PROMPT)
+    # استدعاءات الترجمة بدون تعليمات النظام
+    models.register_model(model, models.MODEL_NAME, models.JSON_CONFIG)
+    models.register_model(model, models.DNA_MODEL_NAME)
+    models.set_safety_settings({})
+    return model
+
+class FakeApify:
+    """
+    بديل لـ ApifyClientAsync: يعيد عنصراً لكل رابط، أو أفضل الفيديوهات لبحث النيش.
+    """
+
+    def __init__(self, profile: Profile = None):
+        self.profile = profile or Profile()
+        self.runs = 0
+        self._datasets = {}
+
+    def client(self, token=None):
+        fake = self
+
+        class _Actor:
+            async def call(self, run_input=None, **kwargs):
+                fake.runs += 1
+                await fake.profile.wait()
+                if fake.profile.outcome() != "ok":
+                    raise FakeServerError("Apify actor run failed")
+                dataset_id = f"ds-{fake.runs}"
+                fake._datasets[dataset_id] = fake._items(run_input or {})
+                return {"defaultDatasetId": dataset_id}
+
+        class _Dataset:
+            def __init__(self, dataset_id):
+                self.dataset_id = dataset_id
+
+            async def list_items(self):
+                return types.SimpleNamespace(items=fake._datasets.pop(self.dataset_id, []))
+
+        class _Client:
+            def actor(self, name):
+                return _Actor()
+
+            def dataset(self, dataset_id):
+                return _Dataset(dataset_id)
+
+        return _Client()
+
+    def _items(self, run_input: dict) -> list:
+        if run_input.get("urls"):
+            return [{"id": str(abs(hash(url)) % 10**19), "text": SAMPLE_TRANSCRIPT, "playCount": 1000} for url in run_input["urls"]]
+        count = run_input.get("resultsPerPage", 10)
+        return [
+            {"id": str(7300000000000000000 + i), "text": f"{SAMPLE_TRANSCRIPT} ({i})", "playCount": 10**6 - i}
+            for i in range(count)
+        ]
+
+def install_fake_apify(fake: FakeApify = None):
+    """
+    apify_client يُستورد داخل دوال المحرك، لذلك يكفي استبدال الوحدة في sys.modules.
+    """
+    fake = fake or FakeApify()
+    module = types.ModuleType("apify_client")
+    module.ApifyClientAsync = fake.client
+    module.ApifyClient = fake.client
+    sys.modules["apify_client"] = module
+    os.environ["APIFY_TOKEN"] = "fake-token"
+    return fake
+
+class FakeRocketAPI:
+    """
+    بديل لنقطة RocketAPI للهاشتاجات عبر httpx.MockTransport.
+    """
+
+    def __init__(self, profile: Profile = None):
+        self.profile = profile or Profile()
+        self.calls = 0
+
+    async def handler(self, request):
+        import httpx
+        self.calls += 1
+        await self.profile.wait()
+        outcome = self.profile.outcome()
+        if outcome == "throttle":
+            return httpx.Response(429, json={"message": "Too many requests"})
+        if outcome == "error":
+            return httpx.Response(500, json={"message": "Upstream error"})
+        keyword = request.url.params.get("keyword", "viral")
+        tags = [{"name": f"{keyword.replace(' ', '').lower()}{i}"} for i in range(12)]
+        return httpx.Response(200, json={"hashtags": tags})
+
+def install_fake_hashtags(fake: FakeRocketAPI = None):
+    import httpx
+    from app.hashtags import hashtag_provider
+    fake = fake or FakeRocketAPI()
+    hashtag_provider.transport = httpx.MockTransport(fake.handler)
+    hashtag_provider._client = None
+    os.environ["RAPID_API_KEY"] = "fake-key"
+    return fake
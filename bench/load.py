@@ -0,0 +1,139 @@
+"""
+اختبار حمل وزمن استجابة للمحرك بدون استهلاك أي حصة حقيقية: Gemini و Apify و RocketAPI
+كلها بدائل محلية بتوزيعات زمن وأخطاء و 429 قابلة للضبط.
+
+    python -m bench.load --mode plain --requests 500 --concurrency 50
+    python -m bench.load --mode clone --gemini-p50 0.8 --gemini-p99 6 --gemini-429 0.05
+    python -m bench.load --mode radar --apify-p50 5
+
+HEDGE_ENABLED=1 (ومتغيرات HEDGE_* الأخرى) يفعّل الطلبات الاحتياطية وتظهر نسبتها وعدد مرات فوزها.
+
+plain يمر عبر /api/v1/generate (FastAPI داخل العملية)، و clone/radar عبر المحرك مباشرة
+لأنهما لا يُعرضان على نقطة التوليد المتزامنة.
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+from bench.common import isolate_environment, summarize, write_results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["plain", "clone", "radar"], default="plain")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--unique", type=float, default=1.0, help="نسبة الطلبات الفريدة (أقل من 1 = طلبات مكررة)")
+    parser.add_argument("--use-cache", action="store_true", help="السماح بالكاش (الافتراضي: refresh لكل طلب)")
+    for name, p50, p99 in (("gemini", 0.8, 4.0), ("apify", 2.0, 8.0), ("hashtags", 0.15, 1.0)):
+        parser.add_argument(f"--{name}-p50", type=float, default=p50)
+        parser.add_argument(f"--{name}-p99", type=float, default=p99)
+        parser.add_argument(f"--{name}-errors", type=float, default=0.0)
+        parser.add_argument(f"--{name}-429", type=float, default=0.0)
+    parser.add_argument("--output", default=None)
+    return parser.parse_args()
+
+def build_requests(args):
+    from app.schemas import DominanceRequest, CreatorDNA
+    distinct = max(1, int(args.requests * args.unique))
+    niches = ["Digital Marketing", "Fitness", "Personal Finance", "E-commerce", "Cooking"]
+    requests = []
+    for i in range(args.requests):
+        n = random.randrange(distinct)
+        requests.append(DominanceRequest(
+            topic_or_keyword=f"Viral topic #{n}",
+            dna=CreatorDNA(niche=niches[n % len(niches)], target_audience="Beginners"),
+        ))
+    return requests
+
+async def run_load(args, fakes):
+    import httpx
+    from app.main import app
+    from app.engine import DominanceEngine, generation_hedger
+    from app.limiter import llm_limiter
+
+    requests = build_requests(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], {}
+    refresh = not args.use_cache
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def one(i, request):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    if args.mode == "plain":
+                        response = await client.post(
+                            "/api/v1/generate", params={"refresh": refresh}, json=request.model_dump(mode="json")
+                        )
+                        ok = response.status_code == 200
+                        kind = str(response.status_code)
+                    else:
+                        await DominanceEngine.aprocess(
+                            request,
+                            video_url=f"https://www.tiktok.com/@bench/video/{7300000000000000000 + i % 50}" if args.mode == "clone" else None,
+                            radar_mode=args.mode == "radar",
+                            refresh=refresh,
+                        )
+                        ok, kind = True, "ok"
+                except Exception as e:
+                    ok, kind = False, type(e).__name__
+                elapsed = time.perf_counter() - start
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[kind] = errors.get(kind, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i, r) for i, r in enumerate(requests)))
+        wall = time.perf_counter() - started
+
+    total = len(requests)
+    return {
+        "mode": args.mode,
+        "requests": total,
+        "concurrency": args.concurrency,
+        "wall_s": wall,
+        "throughput_rps": total / wall if wall else 0.0,
+        "error_rate": sum(errors.values()) / total if total else 0.0,
+        "errors": errors,
+        "latency_s": summarize(latencies),
+        "hedging": generation_hedger.stats(),
+        "limiter": {"throttled": llm_limiter.throttled, "shed": llm_limiter.shed, "final_limit": llm_limiter.limit},
+        "upstream_calls": {
+            "gemini": fakes["gemini"].calls,
+            "gemini_429": fakes["gemini"].throttled,
+            "apify_runs": fakes["apify"].runs,
+            "hashtag_calls": fakes["hashtags"].calls,
+        },
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+    }
+
+def main():
+    args = parse_args()
+    isolate_environment()
+
+    from bench.fakes import Profile, FakeModel, FakeApify, FakeRocketAPI
+    from bench.fakes import install_fake_models, install_fake_apify, install_fake_hashtags
+
+    def profile(name):
+        return Profile(
+            p50=getattr(args, f"{name}_p50"), p99=getattr(args, f"{name}_p99"),
+            error_rate=getattr(args, f"{name}_errors"), throttle_rate=getattr(args, f"{name}_429"),
+        )
+
+    fakes = {
+        "gemini": install_fake_models(FakeModel(profile=profile("gemini"))),
+        "apify": install_fake_apify(FakeApify(profile("apify"))),
+        "hashtags": install_fake_hashtags(FakeRocketAPI(profile("hashtags"))),
+    }
+    results = asyncio.run(run_load(args, fakes))
+    write_results(f"load-{args.mode}", results, args.output)
+    # كل الطلبات فشلت أو لم يصل شيء للخدمات الوهمية = القياس نفسه معطوب، لا أرقام صالحة
+    if results["error_rate"] >= 1.0 or not any(results["upstream_calls"].values()):
+        sys.exit(f"load-{args.mode}: invalid run (error_rate={results['error_rate']}, upstream_calls={results['upstream_calls']})")
+
+if __name__ == "__main__":
+    main()
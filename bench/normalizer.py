@@ -0,0 +1,116 @@
+"""
+مقارنة خط المعالجة القديم (replace + json.loads + recursive_lowercase + normalize_response)
+بخط الإنتاج (salvage_json + normalize_response) على ردود Gemini المحفوظة في bench/fixtures/gemini.
+
+    python -m bench.normalizer --repeat 2000
+"""
+import os
+import json
+import time
+import argparse
+from app import normalizer
+from app.salvage import salvage_json
+from bench.common import summarize, write_results
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "gemini")
+
+# --- الخط القديم كما كان في app/engine.py (مرجع للمقارنة فقط) ---
+def legacy_recursive_lowercase(obj):
+    if isinstance(obj, dict):
+        return {k.lower(): legacy_recursive_lowercase(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_recursive_lowercase(element) for element in obj]
+    else:
+        return obj
+
+def legacy_normalize_response(data, real_hashtags):
+    raw_score = data.get("score_data", data.get("dominance_score", {}))
+    final_score = {"score": 85, "why": ["Analysis pending"], "fix": "Check manually"}
+    if isinstance(raw_score, dict):
+        final_score["score"] = raw_score.get("score", 85)
+        final_score["why"] = raw_score.get("why", ["Good potential"])
+        final_score["fix"] = raw_score.get("fix", raw_score.get("minimum_fix", "Optimize hooks"))
+    elif isinstance(raw_score, (int, float)):
+        final_score["score"] = int(raw_score)
+
+    raw_script = data.get("script", data.get("script_timeline", data.get("timeline", [])))
+    final_script = []
+    if isinstance(raw_script, list):
+        for s in raw_script:
+            if isinstance(s, dict):
+                final_script.append({
+                    "time": s.get("time", s.get("time_start", "00:00")),
+                    "type": s.get("type", "Scene"),
+                    "text": s.get("text", s.get("script", "...")),
+                    "screen": s.get("screen", s.get("screen_text", "")),
+                    "visual": s.get("visual", s.get("visual_direction", "..."))
+                })
+
+    raw_hooks = data.get("hooks", [])
+    final_hooks = []
+    if isinstance(raw_hooks, list):
+        for h in raw_hooks:
+            if isinstance(h, dict):
+                final_hooks.append({
+                    "type": h.get("type", "Hook"),
+                    "text": h.get("text", "..."),
+                    "visual": h.get("visual", h.get("visual_cue", "..."))
+                })
+
+    ai_hashtags = data.get("hashtags", [])
+    final_hashtags = real_hashtags if real_hashtags else (ai_hashtags if isinstance(ai_hashtags, list) else [])
+    return {
+        "score_data": final_score,
+        "hooks": final_hooks,
+        "script": final_script,
+        "hashtags": final_hashtags,
+        "caption": data.get("caption", "Watch this!"),
+        "flex": data.get("flex", data.get("viral_flex_text", "AI Dominator"))
+    }
+
+def legacy_parse(text, real_hashtags):
+    text_content = text.replace("```json", "").replace("```", "").strip()
+    return legacy_normalize_response(legacy_recursive_lowercase(json.loads(text_content)), real_hashtags)
+
+# --- الخط الحالي كما يستدعيه app/engine.py ---
+def current_parse(text, real_hashtags):
+    return normalizer.normalize_response(salvage_json(text), real_hashtags)
+
+def load_fixtures():
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+def time_per_call(fn, text, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(text, [])
+        samples.append(time.perf_counter() - t)
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = {"json_backend": normalizer.JSON_BACKEND}
+    for name, text in load_fixtures().items():
+        # يجب أن يعطي الخطان نفس الحزمة تماماً قبل مقارنة السرعة
+        if legacy_parse(text, []) != current_parse(text, []):
+            raise SystemExit(f"Output mismatch on fixture {name}")
+        legacy = time_per_call(legacy_parse, text, args.repeat)
+        current = time_per_call(current_parse, text, args.repeat)
+        results[name] = {
+            "bytes": len(text.encode("utf-8")),
+            "legacy_s": legacy,
+            "current_s": current,
+            "speedup_p50": legacy["p50"] / current["p50"] if current["p50"] else None,
+        }
+    write_results("normalizer", results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+توكنز المدخلات وزمن الاستجابة لكل نوع طلب، قبل (المخطط غير مُرسل + النص المفرغ كاملاً)
+وبعد (المخطط كتعليمات نظام + قص النص إلى DNA_TRANSCRIPT_TOKEN_BUDGET).
+
+    python -m bench.prompts                       # تقدير محلي بدون شبكة
+    python -m bench.prompts --live --repeat 5     # Gemini حقيقي (GOOGLE_API_KEY): usage_metadata + زمن فعلي
+"""
+import time
+import asyncio
+import argparse
+from bench.common import summarize, write_results
+from bench.fakes import SAMPLE_TRANSCRIPT
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--transcript-tokens", type=int, default=6000, help="طول النص المفرغ الطويل (تقريباً)")
+    parser.add_argument("--output", default=None)
+    return parser.parse_args()
+
+def build_cases(transcript_tokens: int):
+    """
+    لكل نوع طلب: (النموذج، إعدادات JSON أم لا، برومبت قبل، برومبت بعد، تعليمات النظام بعد).
+    """
+    from app.config import get_settings
+    from app.tokens import count_tokens
+    from app.models import MODEL_NAME, DNA_MODEL_NAME
+    from app.prompts import (
+        DOMINATOR_SYSTEM_PROMPT, generate_user_prompt, generate_section_prompt, generate_batch_prompt,
+        generate_dna_analysis_prompt,
+    )
+    settings = get_settings()
+
+    repeats = max(1, transcript_tokens // count_tokens(SAMPLE_TRANSCRIPT))
+    transcript = " ".join([SAMPLE_TRANSCRIPT] * repeats)
+    request = dict(topic="Affiliate marketing for beginners", tone="Energetic", niche="Digital Marketing",
+                   audience="Beginners", language="English")
+    dna = "1. Hook: bold claim. 2. Pacing: fast cuts. 3. Arc: doubt -> proof. 4. CTA: follow for part 2."
+    batch = generate_batch_prompt([dict(request, topic=f"Topic {i}") for i in range(5)], "English")
+
+    cases = {
+        "plain": generate_user_prompt(**request),
+        "clone": generate_user_prompt(**request, reference_dna=dna),
+        "section": generate_section_prompt("script", **request, context="- Hook one"),
+        "packed": batch,
+    }
+    rows = {
+        name: {"model": MODEL_NAME, "json": True, "before": (None, prompt), "after": (DOMINATOR_SYSTEM_PROMPT, prompt)}
+        for name, prompt in cases.items()
+    }
+    rows["dna"] = {
+        "model": DNA_MODEL_NAME, "json": False,
+        "before": (None, generate_dna_analysis_prompt(transcript)),
+        "after": (None, generate_dna_analysis_prompt(transcript, settings.DNA_TRANSCRIPT_TOKEN_BUDGET)),
+    }
+    return rows
+
+def estimate(rows):
+    from app.tokens import count_tokens
+    report = {}
+    for name, row in rows.items():
+        report[name] = {
+            phase: {"input_tokens_est": count_tokens(system or "") + count_tokens(prompt)}
+            for phase, (system, prompt) in ((p, row[p]) for p in ("before", "after"))
+        }
+    return report
+
+async def measure_live(rows, repeat: int):
+    from app.models import get_genai, JSON_CONFIG
+    genai = get_genai()
+    report = {}
+    for name, row in rows.items():
+        report[name] = {}
+        for phase in ("before", "after"):
+            system, prompt = row[phase]
+            model = genai.GenerativeModel(
+                model_name=row["model"], generation_config=JSON_CONFIG if row["json"] else None,
+                system_instruction=system,
+            )
+            latencies, tokens = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = await model.generate_content_async(prompt)
+                latencies.append(time.perf_counter() - start)
+                tokens.append(response.usage_metadata.prompt_token_count)
+            report[name][phase] = {"input_tokens": max(tokens), "latency_s": summarize(latencies)}
+    return report
+
+def main():
+    args = parse_args()
+    rows = build_cases(args.transcript_tokens)
+    results = {"estimate": estimate(rows)}
+    if args.live:
+        results["live"] = asyncio.run(measure_live(rows, args.repeat))
+    write_results("prompts", results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+جودة وتكلفة فهرس المواضيع المتقاربة (app.similarity) بدون شبكة: نسبة التقاط الصيغ المختلفة
+لنفس الموضوع (تشكيل، فراغات، همزات، ترتيب كلمات)، ونسبة التطابق الخاطئ بين مواضيع مختلفة،
+وإعادة الحزمة لمواضيع متقاربة لفظياً ومختلفة المعنى (يجب أن تكون صفراً)، وزمن الإضافة والبحث مع امتلاء الفهرس.
+
+    python -m bench.similarity --entries 5000
+"""
+import time
+import random
+import argparse
+import tracemalloc
+from bench.common import summarize, write_results
+
+TOPICS = [
+    "التسويق بالعمولة للمبتدئين", "الربح من الانترنت بدون رأس مال", "أفضل تمارين البطن في المنزل",
+    "وصفات فطور صحية وسريعة", "كيف تبدأ مشروعك الصغير", "تعلم البرمجة من الصفر",
+    "AI automation for agencies", "Affiliate marketing for beginners", "Morning routine for productivity",
+    "How to grow on TikTok in 2024", "Budget travel tips for Europe", "Home workout without equipment",
+]
+
+# نفس الحروف تقريباً ومعنى مختلف: مسودة للتعديل فقط، لا إعادة
+NEAR_MISSES = [
+    ("Top 5 productivity apps", "Top 10 productivity apps"),
+    ("Why I quit social media", "Why I did not quit social media"),
+    ("Skincare routine for men", "Skincare routine for women"),
+    ("أفضل 5 تطبيقات للإنتاجية", "أفضل 10 تطبيقات للإنتاجية"),
+]
+
+def best_match(index, text: str, threshold: float):
+    # نفس ترتيب app.engine.afind_similar: نفس الكلمات أولاً ثم Jaccard الفعلي
+    from app.similarity import topic_words, jaccard
+    candidates = [
+        (topic_words(value) == topic_words(text), jaccard(text, value), key)
+        for _, key, value in index.query(text, "scope", threshold)
+    ]
+    candidates = [c for c in candidates if c[1] >= threshold]
+    return max(candidates, key=lambda c: c[:2]) if candidates else None
+
+def variants(topic: str, rng: random.Random) -> list:
+    words = topic.split()
+    shuffled = words[:]
+    rng.shuffle(shuffled)
+    return [
+        "  ".join(words),                                             # فراغات
+        topic.upper() if topic.isascii() else topic.replace("ا", "أ", 1),  # حالة الأحرف / همزة
+        "ـ".join(topic[:3]) + topic[3:] if not topic.isascii() else topic + "!",  # تطويل / ترقيم
+        topic.replace("ة", "ه").replace("ي ", "ى "),                # تاء مربوطة / ألف مقصورة
+        " ".join(shuffled),                                           # ترتيب الكلمات
+        topic + (" today" if topic.isascii() else " اليوم"),        # كلمة إضافية (مسودة وليس إعادة)
+        "".join(c + ("\u064e" if i % 3 == 0 and not c.isascii() else "") for i, c in enumerate(topic)),  # تشكيل
+    ]
+
+def filler(i: int, rng: random.Random) -> str:
+    words = ["tips", "growth", "money", "fitness", "recipes", "coding", "travel", "fashion", "crypto", "study",
+             "نصائح", "ربح", "رياضة", "طبخ", "سفر", "برمجة", "موضة", "دراسة", "استثمار", "صحة"]
+    return " ".join(rng.sample(words, 4)) + f" {i}"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000, help="مواضيع عشوائية إضافية في الفهرس")
+    parser.add_argument("--output", default=None)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    from app.config import get_settings
+    from app.similarity import TopicIndex
+    settings = get_settings()
+    rng = random.Random(7)
+
+    tracemalloc.start()
+    index = TopicIndex(
+        num_perm=settings.SIMILAR_NUM_PERM, bands=settings.SIMILAR_BANDS,
+        max_entries=max(settings.SIMILAR_INDEX_SIZE, args.entries + len(TOPICS)),
+    )
+    add_latencies = []
+    for i in range(args.entries):
+        start = time.perf_counter()
+        text = filler(i, rng)
+        index.add(f"filler-{i}", text, "scope", text)
+        add_latencies.append(time.perf_counter() - start)
+    for i, topic in enumerate(TOPICS):
+        index.add(f"topic-{i}", topic, "scope", topic)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    query_latencies, similarities = [], []
+    reused = seeded = missed = wrong = 0
+    for i, topic in enumerate(TOPICS):
+        for variant in variants(topic, rng):
+            start = time.perf_counter()
+            match = best_match(index, variant, settings.SIMILAR_SEED_THRESHOLD)
+            query_latencies.append(time.perf_counter() - start)
+            if match is None:
+                missed += 1
+                continue
+            same_words, similarity, key = match
+            if key != f"topic-{i}":
+                wrong += 1
+                continue
+            similarities.append(similarity)
+            if same_words:
+                reused += 1
+            else:
+                seeded += 1
+
+    wrong_reuse = 0
+    for i, (stored, query) in enumerate(NEAR_MISSES):
+        index.add(f"near-{i}", stored, "scope", stored)
+        match = best_match(index, query, settings.SIMILAR_SEED_THRESHOLD)
+        wrong_reuse += bool(match and match[0])
+
+    total = reused + seeded + missed + wrong
+    write_results("similarity", {
+        "entries": len(index),
+        "memory_bytes_per_entry": memory // max(1, len(index)),
+        "variants": total,
+        "reuse_rate": reused / total,
+        "seed_rate": seeded / total,
+        "miss_rate": missed / total,
+        "wrong_match_rate": wrong / total,
+        "near_miss_reuse_rate": wrong_reuse / len(NEAR_MISSES),
+        "similarity": summarize(similarities),
+        "add_latency_s": summarize(add_latencies),
+        "query_latency_s": summarize(query_latencies),
+    }, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+قياس زمن الإقلاع البارد للعامل والحمل الإضافي للمحرك في كل طلب.
+
+    python -m bench.startup --runs 10 --requests 500
+"""
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+from bench.common import isolate_environment, summarize, write_results
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+FIRST_MODEL_SNIPPET = (
+    "import time, app.models as m; t = time.perf_counter(); "
+    "m.get_model(m.MODEL_NAME, m.JSON_CONFIG); m.get_safety_settings(); print(time.perf_counter() - t)"
+)
+
+def cold_samples(snippet: str, runs: int):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True)
+        if out.returncode != 0:
+            return {"error": out.stderr.strip().splitlines()[-1] if out.stderr else "failed"}
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return summarize(samples)
+
+def legacy_model_overhead(n: int):
+    """
+    الطريقة القديمة: نموذج جديد وقاموس أمان جديد مع كل طلب (يتطلب SDK جوجل).
+    """
+    try:
+        import google.generativeai as genai
+        from google.generativeai.types import HarmCategory, HarmBlockThreshold
+    except ImportError as e:
+        return {"error": str(e)}
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        genai.GenerativeModel(model_name="gemini-flash-latest", generation_config={"response_mime_type": "application/json"})
+        {
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+        }
+        samples.append(time.perf_counter() - t)
+    return summarize(samples)
+
+def registry_model_overhead(n: int):
+    from app.engine import build_generation_model
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        build_generation_model()
+        samples.append(time.perf_counter() - t)
+    return summarize(samples)
+
+async def engine_overhead(n: int):
+    """
+    زمن aprocess كاملاً مع نموذج وهمي فوري: كل ما يُقاس هنا هو حمل المحرك نفسه.
+    """
+    from app.engine import DominanceEngine
+    from app.schemas import DominanceRequest, CreatorDNA
+    samples = []
+    for i in range(n):
+        request = DominanceRequest(
+            topic_or_keyword=f"AI Automation #{i}",
+            dna=CreatorDNA(niche="Digital Marketing", target_audience="Agency Owners"),
+        )
+        t = time.perf_counter()
+        await DominanceEngine.aprocess(request, refresh=True)
+        samples.append(time.perf_counter() - t)
+    return summarize(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="عدد عمليات الإقلاع البارد")
+    parser.add_argument("--requests", type=int, default=500, help="عدد الطلبات لقياس الحمل الإضافي")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    isolate_environment()
+    results = {
+        "cold_import_app_engine_s": cold_samples(IMPORT_SNIPPET.format(module="app.engine"), args.runs),
+        "cold_import_app_main_s": cold_samples(IMPORT_SNIPPET.format(module="app.main"), args.runs),
+        "first_model_build_s": cold_samples(FIRST_MODEL_SNIPPET, args.runs),
+        "legacy_model_per_request_s": legacy_model_overhead(args.requests),
+    }
+
+    from bench.fakes import install_fake_models
+    install_fake_models()
+    results["registry_model_per_request_s"] = registry_model_overhead(args.requests)
+    results["engine_overhead_per_request_s"] = asyncio.run(engine_overhead(args.requests))
+    write_results("startup", results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+تكلفة نفس الحزمة بعدة لغات: قبل (توليد إبداعي كامل لكل لغة) وبعد (توليد واحد + استدعاء
+ترجمة واحد لكل اللغات الباقية، النصوص فقط).
+
+    python -m bench.translate --languages English Arabic Spanish        # تقدير محلي بدون شبكة
+    python -m bench.translate --live --repeat 3                         # Gemini حقيقي (GOOGLE_API_KEY)
+"""
+import json
+import time
+import asyncio
+import argparse
+from bench.common import summarize, write_results
+from bench.fakes import SAMPLE_PAYLOAD
+
+REQUEST = dict(topic="Affiliate marketing for beginners", tone="Energetic", niche="Digital Marketing", audience="Beginners")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--languages", nargs="+", default=["English", "Arabic", "Spanish", "French"])
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    return parser.parse_args()
+
+def sample_pack() -> dict:
+    from app.normalizer import normalize_response
+    return normalize_response(json.loads(SAMPLE_PAYLOAD), [])
+
+def build_prompts(languages: list):
+    from app.prompts import DOMINATOR_SYSTEM_PROMPT, generate_user_prompt, generate_translate_prompt
+    from app.translate import extract_text
+    source, targets = languages[0], languages[1:]
+    text = json.dumps(extract_text(sample_pack()), ensure_ascii=False)
+    return {
+        "generate": {lang: (DOMINATOR_SYSTEM_PROMPT, generate_user_prompt(**REQUEST, language=lang)) for lang in languages},
+        "translate": (None, generate_translate_prompt(text, source, targets)) if targets else None,
+        "text": text,
+    }
+
+def estimate(languages: list) -> dict:
+    from app.tokens import count_tokens
+    prompts = build_prompts(languages)
+    full_output = count_tokens(SAMPLE_PAYLOAD)
+    per_generation = {
+        lang: count_tokens(system) + count_tokens(prompt) for lang, (system, prompt) in prompts["generate"].items()
+    }
+
+    before_in = sum(per_generation.values())
+    before_out = full_output * len(languages)
+    after_in = per_generation[languages[0]]
+    after_out = full_output
+    if prompts["translate"]:
+        after_in += count_tokens(prompts["translate"][1])
+        # رد الترجمة = النصوص فقط لكل لغة
+        after_out += count_tokens(prompts["text"]) * (len(languages) - 1)
+
+    return {
+        "languages": languages,
+        "before": {"calls": len(languages), "input_tokens_est": before_in, "output_tokens_est": before_out},
+        "after": {"calls": 2 if len(languages) > 1 else 1, "input_tokens_est": after_in, "output_tokens_est": after_out},
+        "saved_tokens_est": (before_in + before_out) - (after_in + after_out),
+    }
+
+async def measure_live(languages: list, repeat: int) -> dict:
+    from app.models import get_genai, MODEL_NAME, JSON_CONFIG
+    genai = get_genai()
+    prompts = build_prompts(languages)
+    report = {}
+
+    async def timed(model, prompt):
+        latencies, usage = [], {"input_tokens": 0, "output_tokens": 0}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await model.generate_content_async(prompt)
+            latencies.append(time.perf_counter() - start)
+            usage["input_tokens"] = max(usage["input_tokens"], response.usage_metadata.prompt_token_count)
+            usage["output_tokens"] = max(usage["output_tokens"], response.usage_metadata.candidates_token_count)
+        return {**usage, "latency_s": summarize(latencies)}
+
+    system, prompt = prompts["generate"][languages[0]]
+    generator = genai.GenerativeModel(model_name=MODEL_NAME, generation_config=JSON_CONFIG, system_instruction=system)
+    report["generate"] = await timed(generator, prompt)
+    if prompts["translate"]:
+        translator = genai.GenerativeModel(model_name=MODEL_NAME, generation_config=JSON_CONFIG)
+        report["translate"] = await timed(translator, prompts["translate"][1])
+    return report
+
+def main():
+    args = parse_args()
+    results = {"estimate": estimate(args.languages)}
+    if args.live:
+        results["live"] = asyncio.run(measure_live(args.languages, args.repeat))
+    write_results("translate", results, args.output)
+
+if __name__ == "__main__":
+    main()
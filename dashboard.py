@@ -1,8 +1,21 @@
+import html
 import streamlit as st
+from app.config import get_settings
 from app.schemas import DominanceRequest, CreatorDNA, Platform, ContentTone
-from app.engine import DominanceEngine
 
 st.set_page_config(page_title="AI DOMINATOR", page_icon="🦅", layout="wide")
+settings = get_settings()
+
+# المحرك يُحمّل مرة واحدة لكل عملية Streamlit وليس مع كل rerun:
+# داخل العملية، أو عميل HTTP واحد (keep-alive) للـ API عند ضبط DASHBOARD_ENGINE_URL
+@st.cache_resource
+def get_engine():
+    from app.client import get_engine
+    return get_engine()
+
+# آخر حزمة تبقى معروضة عند أي تفاعل (تغيير اللغة، فتح حاوية...) بدون استدعاء جديد
+if "result" not in st.session_state:
+    st.session_state.result = None
 
 TRANSLATIONS = {
     "English": {
@@ -35,6 +48,7 @@ with st.sidebar:
     audience = st.text_input(t['lbl_audience'], "Youth")
     tone = st.selectbox("Tone", ["controversial", "educational", "storytelling"])
     platform = st.selectbox("Platform", ["tiktok", "instagram"])
+    refresh = st.checkbox("🔄 Force Refresh (skip cache)", value=False)
     
     c1, c2 = st.columns(2)
     with c1: btn_exec = st.button(t['btn_exec'], type="primary", use_container_width=True)
@@ -58,57 +72,103 @@ with col2: st.title("AI DOMINATOR // GLOBAL")
 active_btn = "exec" if btn_exec else ("radar" if btn_radar else None)
 radar_mode = (active_btn == "radar")
 
+def render_score(score_data):
+    c1, c2 = st.columns([1, 2])
+    with c1: st.markdown(f'<div class="big-score">{html.escape(str(score_data["score"]))}%</div>', unsafe_allow_html=True)
+    with c2: 
+        st.info(f"💡 Fix: {score_data['fix']}")
+        st.caption(f"Why: {', '.join(score_data['why'])}")
+
+def render_hook(h):
+    with st.container(border=True):
+        st.markdown(f"**{h['type']}**")
+        st.code(h['text'], language="text")
+        st.markdown(f"<span class='visual-tag'>👁️ {html.escape(str(h['visual']))}</span>", unsafe_allow_html=True)
+
+def scene_html(s):
+    e = {k: html.escape(str(s.get(k, ""))) for k in ("time", "type", "text", "visual", "screen")}
+    return f"""
+    <div class="script-box">
+        <div style="color: #9ca3af; font-size: 0.8em;">⏱️ {e['time']} | {e['type']}</div>
+        <div style="font-size: 1.1em; margin: 5px 0; color: white;">{e['text']}</div>
+        <div style="margin-top: 10px;">
+            <span class="visual-tag">🎥 {e['visual']}</span><br>
+            <span class="screen-tag">📺 {e['screen']}</span>
+        </div>
+    </div>
+    """
+
+def render_script(slot, scenes):
+    # السيناريو كله في عنصر HTML واحد بدل st.markdown لكل مشهد
+    slot.markdown("".join(scene_html(s) for s in scenes), unsafe_allow_html=True)
+
+def render_footer(data):
+    full_text = "".join(f"[{s['time']}] {s['text']}\n" for s in data["script"])
+    st.markdown("👇 **Copy Full Script**")
+    st.code(full_text, language="text")
+
+    st.divider()
+    st.subheader("#️⃣ Hashtags")
+    st.code(" ".join(data["hashtags"]), language="text")
+
+def layout():
+    # أماكن ثابتة تمتلئ تدريجياً مع وصول كل جزء من البث
+    score_area = st.container()
+    st.divider()
+    st.subheader(f"🪝 {t['res_hooks']}")
+    hooks_area = st.container()
+    st.divider()
+    st.subheader(f"📜 {t['res_script']}")
+    script_area = st.empty()
+    footer_area = st.container()
+    return score_area, hooks_area, script_area, footer_area
+
+def render_pack(data):
+    score_area, hooks_area, script_area, footer_area = layout()
+    with score_area: render_score(data["score_data"])
+    with hooks_area:
+        for h in data["hooks"]:
+            render_hook(h)
+    render_script(script_area, data["script"])
+    with footer_area: render_footer(data)
+
 if active_btn:
     msg = "جاري مسح الرادار..." if radar_mode else "جاري المعالجة..."
-    with st.status(f"⚙️ {msg}", expanded=True) as status:
-        try:
-            req = DominanceRequest(
-                topic_or_keyword=topic, platform=Platform(platform), tone=ContentTone(tone),
-                dna=CreatorDNA(niche=niche, target_audience=audience, key_strengths=[])
-            )
-            
-            data = DominanceEngine.process(req, language=lang_code, video_url=video_url, radar_mode=radar_mode)
-            status.update(label="✅ Done!", state="complete", expanded=False)
-            
-            # --- النتائج (باستخدام البيانات الموحدة) ---
-            score_data = data["score_data"]
-            c1, c2 = st.columns([1, 2])
-            with c1: st.markdown(f'<div class="big-score">{score_data["score"]}%</div>', unsafe_allow_html=True)
-            with c2: 
-                st.info(f"💡 Fix: {score_data['fix']}")
-                st.caption(f"Why: {', '.join(score_data['why'])}")
-
-            st.divider()
-            st.subheader(f"🪝 {t['res_hooks']}")
-            for h in data["hooks"]:
-                with st.container(border=True):
-                    st.markdown(f"**{h['type']}**")
-                    st.code(h['text'], language="text")
-                    st.markdown(f"<span class='visual-tag'>👁️ {h['visual']}</span>", unsafe_allow_html=True)
-
-            st.divider()
-            st.subheader(f"📜 {t['res_script']}")
-            full_text = ""
-            for s in data["script"]:
-                full_text += f"[{s['time']}] {s['text']}\n"
-                st.markdown(f"""
-                <div class="script-box">
-                    <div style="color: #9ca3af; font-size: 0.8em;">⏱️ {s['time']} | {s['type']}</div>
-                    <div style="font-size: 1.1em; margin: 5px 0; color: white;">{s['text']}</div>
-                    <div style="margin-top: 10px;">
-                        <span class="visual-tag">🎥 {s['visual']}</span><br>
-                        <span class="screen-tag">📺 {s['screen']}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-
-            st.markdown("👇 **Copy Full Script**")
-            st.code(full_text, language="text")
-            
-            st.divider()
-            st.subheader("#️⃣ Hashtags")
-            st.code(" ".join(data["hashtags"]), language="text")
-
-        except Exception as e:
-            status.update(label="❌ Error", state="error")
-            st.error(f"System Error: {str(e)}")
+    status = st.status(f"⚙️ {msg}", expanded=True)
+    score_area, hooks_area, script_area, footer_area = layout()
+
+    try:
+        req = DominanceRequest(
+            topic_or_keyword=topic, platform=Platform(platform), tone=ContentTone(tone),
+            dna=CreatorDNA(niche=niche, target_audience=audience, key_strengths=[])
+        )
+
+        data = None
+        scenes = []
+        for event in get_engine().stream(req, language=lang_code, video_url=video_url, radar_mode=radar_mode, refresh=refresh):
+            piece = event["data"]
+            if event["event"] == "score":
+                with score_area: render_score(piece)
+            elif event["event"] == "hook":
+                with hooks_area: render_hook(piece)
+            elif event["event"] == "scene":
+                scenes.append(piece)
+                render_script(script_area, scenes)
+            elif event["event"] == "pack":
+                data = piece
+
+        status.update(label="✅ Done!", state="complete", expanded=False)
+        # الحزمة النهائية الموحدة قد تختلف عن أجزاء البث (إصلاح أقسام ناقصة)
+        render_script(script_area, data["script"])
+        with footer_area: render_footer(data)
+        st.session_state.result = {"pack": data, "language": lang_code}
+
+    except Exception as e:
+        status.update(label="❌ Error", state="error")
+        st.error(f"System Error: {str(e)}")
+
+elif st.session_state.result:
+    result = st.session_state.result
+    if result["language"] != lang_code:
+        st.caption(f"🌐 {result['language']}")
+    render_pack(result["pack"])
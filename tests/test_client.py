@@ -0,0 +1,56 @@
+"""
+RemoteEngine مقابل تطبيق FastAPI الحقيقي (httpx.ASGITransport) مع نموذج وهمي:
+أي اختلاف بين ما يعيده المحرك و response_model يظهر هنا كفشل وليس 500 في الإنتاج.
+"""
+import asyncio
+import threading
+import httpx
+from bench.common import isolate_environment
+
+isolate_environment()
+
+from app.main import app  # noqa: E402
+from app.client import RemoteEngine  # noqa: E402
+from app.schemas import DominanceRequest, CreatorDNA, ContentTone  # noqa: E402
+from bench.fakes import FakeModel, install_fake_models  # noqa: E402
+
+class SyncASGITransport(httpx.BaseTransport):
+    """
+    RemoteEngine يستخدم httpx.Client متزامناً: نمرر طلباته إلى ASGITransport على حلقة في خيط منفصل.
+    """
+
+    def __init__(self, app):
+        self.transport = httpx.ASGITransport(app=app)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        response = await self.transport.handle_async_request(request)
+        content = await response.aread()
+        return httpx.Response(response.status_code, headers=response.headers, content=content, request=request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        return asyncio.run_coroutine_threadsafe(self._send(request), self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+def test_process_through_real_app():
+    install_fake_models(FakeModel())
+    engine = RemoteEngine("http://testserver", transport=SyncASGITransport(app))
+    request = DominanceRequest(
+        topic_or_keyword="Affiliate marketing for beginners", tone=ContentTone.EDUCATIONAL,
+        dna=CreatorDNA(niche="Digital Marketing", target_audience="Beginners"),
+    )
+    try:
+        pack = engine.process(request, language="English")
+    finally:
+        engine.close()
+
+    assert pack["score_data"]["score"] == 91
+    assert len(pack["hooks"]) == 3
+    assert pack["hooks"][1]["visual"] == "Close-up, raised eyebrow"
+    assert [scene["type"] for scene in pack["script"]][0] == "Hook"
+    assert pack["flex"] == "Built with AI Dominator"
+    assert pack["degradations"] == []
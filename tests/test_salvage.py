@@ -0,0 +1,34 @@
+"""
+إصلاح ردود النموذج المعيبة: كل خطاف ومشهد اكتمل يبقى، والجزء الناقص فقط يسقط.
+"""
+import json
+import pytest
+from app.salvage import repair_json, salvage_json, missing_sections
+from bench.fakes import SAMPLE_PAYLOAD
+
+def test_truncated_reply_keeps_complete_items():
+    text = '{"hooks": [{"text": "a"}, {"text": "b"}, {"te'
+    assert json.loads(repair_json(text)) == {"hooks": [{"text": "a"}, {"text": "b"}]}
+
+def test_trailing_commas_are_dropped():
+    text = '{"hooks": [1, 2,], "score_data": {"score": 88,},}'
+    assert json.loads(repair_json(text)) == {"hooks": [1, 2], "score_data": {"score": 88}}
+
+def test_prose_and_fences_around_object():
+    text = 'Sure! Here is your pack:\n```json\n{"caption": "x } y", "flex": "[z"}\n```\nEnjoy.'
+    assert json.loads(repair_json(text)) == {"caption": "x } y", "flex": "[z"}
+
+def test_nothing_to_salvage():
+    with pytest.raises(ValueError):
+        repair_json("no json here")
+    with pytest.raises(ValueError):
+        repair_json('{"caption": "cut off')
+
+def test_salvage_fenced_full_pack():
+    data = salvage_json(f"```json\n{SAMPLE_PAYLOAD}\n```")
+    assert data == json.loads(SAMPLE_PAYLOAD)
+    assert missing_sections(data) == []
+
+def test_salvage_reports_missing_sections():
+    data = salvage_json('{"score_data": {"score": 70}, "hooks": [{"text": "a"}], "script": [{"time": "00:00"')
+    assert missing_sections(data) == ["script"]
@@ -0,0 +1,30 @@
+"""
+توحيد المواضيع: نفس الكلمات بصيغ مختلفة تُعاد حزمتها، وأي كلمة مختلفة تمنع ذلك.
+"""
+from bench.common import isolate_environment
+
+isolate_environment()
+
+from app.similarity import normalize_topic  # noqa: E402
+from app.engine import is_same_topic  # noqa: E402
+
+def test_normalize_topic_folds_arabic_forms():
+    assert normalize_topic("  أفضل   الإستراتيجيات!! ") == "افضل الاستراتيجيات"
+    assert normalize_topic("مَدْرَسَة") == normalize_topic("مدرسه")
+    assert normalize_topic("إلى مستشفى") == normalize_topic("الي مستشفي")
+    assert normalize_topic("٥ نصائح") == "5 نصايح"
+
+def test_normalize_topic_ignores_case_and_punctuation():
+    assert normalize_topic("Top-5 TIPS") == "top 5 tips"
+    assert normalize_topic("ＴＯＰ５") == "top5"
+    assert normalize_topic(None) == ""
+
+def test_same_topic_ignores_form_and_order():
+    assert is_same_topic("Top 5 tips", "top 5 TIPS!")
+    assert is_same_topic("5 tips", "tips 5")
+    assert is_same_topic("أفضل نصيحة", "افضل نصيحه")
+
+def test_different_words_are_not_the_same_topic():
+    assert not is_same_topic("top 5 tips", "top 10 tips")
+    assert not is_same_topic("tips for beginners", "tips for beginners no")
+    assert not is_same_topic("tips tips", "tips")
@@ -0,0 +1,35 @@
+"""
+القارئ التدريجي يجب أن يعطي نفس الأحداث مهما كانت حدود الأجزاء القادمة من النموذج.
+"""
+import json
+from app.streaming import IncrementalJSONParser
+from bench.fakes import SAMPLE_PAYLOAD
+
+def parse_in_chunks(text: str, size: int) -> list:
+    parser = IncrementalJSONParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+def test_chunk_boundaries_do_not_change_events():
+    whole = parse_in_chunks(SAMPLE_PAYLOAD, len(SAMPLE_PAYLOAD))
+    data = json.loads(SAMPLE_PAYLOAD)
+    assert [kind for kind, _ in whole].count("hook") == len(data["hooks"])
+    assert [kind for kind, _ in whole].count("scene") == len(data["script"])
+    assert ("score", data["Score_Data"]) in whole
+    for size in (1, 2, 7, 64):
+        assert parse_in_chunks(SAMPLE_PAYLOAD, size) == whole
+
+def test_escaped_quotes_and_brackets_inside_strings():
+    text = '```json\n{"hooks": [{"text": "He said \\"stop}\\" ]", "visual": "a\\\\"}, {"text": "b"}]}'
+    expected = [("hook", {"text": 'He said "stop}" ]', "visual": "a\\"}), ("hook", {"text": "b"})]
+    for size in (1, 3, len(text)):
+        assert parse_in_chunks(text, size) == expected
+
+def test_alias_keys_and_nested_objects_are_not_events():
+    text = '{"Dominance_Score": {"score": 70}, "timeline": [{"time": "00:01", "meta": {"x": 1}}], "extra": {"hooks": [{"text": "no"}]}}'
+    assert parse_in_chunks(text, 5) == [
+        ("score", {"score": 70}),
+        ("scene", {"time": "00:01", "meta": {"x": 1}}),
+    ]
@@ -0,0 +1,57 @@
+"""
+كل صيغ روابط تيك توك (كاملة، موبايل، مع باراميترات، مختصرة) تعطي نفس رقم الفيديو.
+"""
+import asyncio
+import functools
+import types
+import httpx
+from bench.common import isolate_environment
+
+isolate_environment()
+
+from app import tiktok  # noqa: E402
+from app.tiktok import extract_video_id, resolve_video_id  # noqa: E402
+
+VIDEO_ID = "7301234567890123456"
+
+def test_extract_video_id_formats():
+    assert extract_video_id(f"https://www.tiktok.com/@creator/video/{VIDEO_ID}") == VIDEO_ID
+    assert extract_video_id(f"https://www.tiktok.com/@creator/video/{VIDEO_ID}?is_from_webapp=1&sender_device=pc") == VIDEO_ID
+    assert extract_video_id(f"https://m.tiktok.com/v/{VIDEO_ID}.html?u_code=abc") == VIDEO_ID
+    assert extract_video_id(f"https://www.tiktok.com/embed/v2/{VIDEO_ID}") == VIDEO_ID
+    assert extract_video_id(f"  https://www.tiktok.com/@creator/video/{VIDEO_ID}/  ") == VIDEO_ID
+    assert extract_video_id("https://vm.tiktok.com/ZMabc123/") is None
+    assert extract_video_id("https://www.tiktok.com/@creator?video=123") is None
+
+def test_resolve_without_network():
+    assert asyncio.run(resolve_video_id(f"https://m.tiktok.com/v/{VIDEO_ID}.html?u_code=abc")) == VIDEO_ID
+    assert asyncio.run(resolve_video_id(f"https://www.youtube.com/video/{VIDEO_ID}")) is None
+    assert asyncio.run(resolve_video_id("https://www.tiktok.com/@creator")) is None
+
+def fake_redirects(monkeypatch, target: str) -> list:
+    # الرابط المختصر يعيد التوجيه للرابط الكامل بباراميترات التتبع
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        if request.url.host in tiktok.SHORT_HOSTS or request.url.path.startswith("/t/"):
+            return httpx.Response(301, headers={"Location": target})
+        return httpx.Response(200)
+
+    client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tiktok, "httpx", types.SimpleNamespace(AsyncClient=client))
+    return requests
+
+def test_resolve_short_links_once(monkeypatch):
+    requests = fake_redirects(monkeypatch, f"https://www.tiktok.com/@creator/video/{VIDEO_ID}?_r=1&_t=8abc")
+    assert asyncio.run(resolve_video_id("https://vm.tiktok.com/ZMshort1/")) == VIDEO_ID
+    assert asyncio.run(resolve_video_id("https://www.tiktok.com/t/ZTshort2/")) == VIDEO_ID
+    assert len(requests) == 4
+    # الوجهة محفوظة في الكاش: نفس الرابط (بدون / أو بحالة أحرف مختلفة للمضيف) لا يطلب الشبكة
+    assert asyncio.run(resolve_video_id("https://VM.tiktok.com/ZMshort1")) == VIDEO_ID
+    assert len(requests) == 4
+
+def test_short_link_without_video(monkeypatch):
+    requests = fake_redirects(monkeypatch, "https://www.tiktok.com/@creator")
+    assert asyncio.run(resolve_video_id("https://vt.tiktok.com/ZMshort3/")) is None
+    assert len(requests) == 2